@@ -1,6 +1,6 @@
 import numpy as np
 import pygame
-from curve import *
+from geometry import *
 
 SCREEN_SIZE = (1200, 800)
 POINT_RADIUS = 5
@@ -29,6 +29,8 @@ class Environment():
 
         self.max_curves = 2
         self.num_curves = 1
+        # the samples of every curve, one after the other, refilled in place every frame
+        self.samples = np.empty((0, 2))
 
     def add_curve(self, curve):
 
@@ -54,6 +56,12 @@ class Environment():
             if self.active_curve_index >= self.num_curves:
                 self.active_curve_index = self.num_curves - 1
 
+    def sample_buffer(self, num_points):
+        # grows to the largest scene drawn so far, never shrinks
+        if len(self.samples) < num_points:
+            self.samples = np.empty((num_points, 2))
+        return self.samples[:num_points]
+
     def active_curve(self):
         if isinstance(self.curves[self.active_curve_index], Nurb):
             self.curve_mode = True
@@ -169,13 +177,11 @@ class Environment():
             for i in range(len(self.active_curve().points) - 1):
                 pygame.draw.line(self.screen, GREY, (int(x_coords[i]), int(y_coords[i])), (int(x_coords[i + 1]), int(y_coords[i + 1])), 1)
 
-        for curve in self.curves:
-            n = len(curve.points)
-            if n >= K:
-                curve_points = curve.create_curve(50 * n)
-                for point1, point2 in ((p1, curve_points[p1_index + 1])
-                                    for p1_index, p1 in enumerate(curve_points[:-2])):
-                    pygame.draw.line(self.screen, BLACK, point1, point2, 1)
+        # every curve in one batched evaluation, into one buffer
+        drawn = [curve for curve in self.curves if len(curve.points) > curve.degree]
+        counts = [50 * len(curve.points) for curve in drawn]
+        for curve_points in create_curves(drawn, counts, out=self.sample_buffer(sum(counts))):
+            pygame.draw.lines(self.screen, BLACK, False, curve_points, 1)
 
         font = pygame.font.Font(None, 24)
         if self.show_points:
@@ -215,8 +221,7 @@ class Environment():
                 self.handle_event(event)
 
             if self.drag_id is not None:
-                pos = pygame.mouse.get_pos()
-                self.active_curve().points[self.drag_id] = np.array((*pos, 1, self.active_curve().points[self.drag_id,-1]))
+                self.active_curve().points[self.drag_id, :2] = pygame.mouse.get_pos()
             
             self.draw()
             self.clock.tick(60)
@@ -1,3 +1,9 @@
+import os
+import sys
+
+# the shared geometry package sits next to this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from environment import Environment
 
 if __name__ == "__main__":
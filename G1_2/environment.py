@@ -1,6 +1,7 @@
 import numpy as np
 import pygame
-from curve import *
+from geometry import *
+from history import History
 
 SCREEN_SIZE = (1200, 800)
 POINT_RADIUS = 5
@@ -25,11 +26,20 @@ class Environment():
         self.weight_mode = False
         self.curve_mode = True #Nurbs
         self.show_points = True
+        self.show_intersections = False
+        self.freehand_mode = False
+        self.stroke = None
+        # the samples of every curve, one after the other, refilled in place every frame
+        self.samples = np.empty((0, 2))
+        self.history = History()
+        self.drag_snapshot = None
 
         self.max_curves = 2
         self.num_curves = 1
-        self.nurbs_max = 4
+        self.nurbs_max = 8
         self.bezier_max = 5
+        self.degree_min = 1
+        self.degree_max = 5
 
     def add_curve(self, curve):
 
@@ -37,9 +47,16 @@ class Environment():
             print(str(self.max_curves) + " curves already created")
             return
            
+        self.history.replace_curves(self.curves, self.curves + [curve])
         self.curves.append(curve)
         self.num_curves = len(self.curves)
 
+    def sample_buffer(self, num_points):
+        # grows to the largest scene drawn so far, never shrinks
+        if len(self.samples) < num_points:
+            self.samples = np.empty((num_points, 2))
+        return self.samples[:num_points]
+
     def active_curve(self):
         if isinstance(self.curves[self.active_curve_index], Nurb):
             self.curve_mode = True
@@ -60,11 +77,10 @@ class Environment():
             closest_index = close_point_indices[0, 0]
             return closest_index + (0 if self.drag_id is None else (0 if self.drag_id > closest_index else 1))
         
-    def handle_event(self, event):
+    def handle_event(self, event, pos):
         if event.type == pygame.QUIT:
             self.is_running = False
 
-        pos = pygame.mouse.get_pos()
         if event.type == pygame.MOUSEBUTTONUP:
             self.handle_event_mouse_up(pos)
         if event.type == pygame.MOUSEBUTTONDOWN:
@@ -76,9 +92,17 @@ class Environment():
             self.screen = pygame.display.set_mode(SCREEN_SIZE, pygame.RESIZABLE)
     
     def handle_event_mouse_up(self, pos):
+        if self.stroke is not None:
+            self.fit_stroke(pos)
+            return
+        # the whole drag is one history entry
+        if self.drag_snapshot is not None:
+            self.history.commit(self.drag_snapshot)
+            self.drag_snapshot = None
 
         point = np.array((*pos, 1, 1))
         index = self.click_collision(pos)
+        snapshot = self.history.snapshot([self.active_curve()])
 
         if not self.weight_mode:
             if self.create and index is None and not np.any(np.all(self.active_curve().points[:, :-2] == point[:-2], axis=1)):
@@ -97,11 +121,26 @@ class Environment():
                 else:
                     self.active_curve().points[index-1, -1] = max(1, self.active_curve().points[index-1, -1] -1)
                 
+        self.history.commit(snapshot)
         self.drag_id = None
 
     def handle_event_mouse_down(self, pos):
-        if (index := self.click_collision(pos)) is not None:
+        if self.freehand_mode and isinstance(self.active_curve(), Nurb):
+            self.stroke = NurbFit(self.nurbs_max, self.active_curve().degree)
+            self.stroke.add(pos)
+        elif (index := self.click_collision(pos)) is not None:
             self.drag_id = index
+            self.drag_snapshot = self.history.snapshot([self.active_curve()])
+
+    def fit_stroke(self, pos):
+        self.stroke.add(pos)
+        snapshot = self.history.snapshot([self.active_curve()])
+        try:
+            self.active_curve().points = self.stroke.curve().points
+        except ValueError as error:
+            print(error)
+        self.history.commit(snapshot)
+        self.stroke = None
 
     def handle_event_keyboard(self, event):
         match event.key:
@@ -110,11 +149,17 @@ class Environment():
             case pygame.K_w:
                 self.weight_mode = not self.weight_mode
             case pygame.K_r:
-                self.curves = [Nurb()]
+                curves = [Nurb()]
+                self.history.replace_curves(self.curves, curves)
+                self.curves = curves
                 self.active_curve_index = 0
                 self.num_curves = len(self.curves)
             case pygame.K_t:
                 self.show_points = not self.show_points
+            case pygame.K_i:
+                self.show_intersections = not self.show_intersections
+            case pygame.K_f:
+                self.freehand_mode = not self.freehand_mode
             case pygame.K_q:
                 self.active_curve_index -= 1
                 if self.active_curve_index < 0:
@@ -130,13 +175,37 @@ class Environment():
                 self.add_curve(Bezier())
                 self.active_curve_index = len(self.curves) - 1
             case pygame.K_c:
+                snapshot = self.history.snapshot(self.curves)
                 self.c0()
+                self.history.commit(snapshot)
             case pygame.K_v:
+                snapshot = self.history.snapshot(self.curves)
                 self.g1()
+                self.history.commit(snapshot)
             case pygame.K_b:
+                snapshot = self.history.snapshot(self.curves)
                 self.g2()
+                self.history.commit(snapshot)
+            case pygame.K_MINUS | pygame.K_KP_MINUS:
+                self.change_degree(-1)
+            case pygame.K_EQUALS | pygame.K_PLUS | pygame.K_KP_PLUS:
+                self.change_degree(1)
+            case pygame.K_z | pygame.K_y if self.drag_id is not None or self.stroke is not None:
+                pass  # the drag or stroke becomes its own entry on mouse up, undo after that
+            case pygame.K_z:
+                self.history.undo(self)
+            case pygame.K_y:
+                self.history.redo(self)
             
 
+    def change_degree(self, step):
+        curve = self.active_curve()
+        if not isinstance(curve, Nurb):
+            print("Bezier degree is set by its number of control points.")
+            return
+        degree = min(max(curve.degree + step, self.degree_min), self.degree_max)
+        self.history.change_degree(curve, degree)
+
     def c0(self):
         for curva_1, curva_2 in zip(self.curves, self.curves[1:]):
             end_point = curva_1.points[-1]
@@ -210,12 +279,15 @@ class Environment():
                 for i in range(len(curve.points) - 1):
                     pygame.draw.line(self.screen, GREY, (int(x_coords[i]), int(y_coords[i])), (int(x_coords[i + 1]), int(y_coords[i + 1])), 1)
 
-        for curve in self.curves:
-            n = len(curve.points)
-            curve_points = curve.create_curve(100 * n)
-            for point1, point2 in ((p1, curve_points[p1_index + 1])
-                                for p1_index, p1 in enumerate(curve_points[:-2])):
-                pygame.draw.line(self.screen, BLACK, point1, point2, 1)
+        # every curve in one batched evaluation, into one buffer
+        drawn = [curve for curve in self.curves if len(curve.points) >= 2]
+        counts = [100 * len(curve.points) for curve in drawn]
+        for curve_points in create_curves(drawn, counts, out=self.sample_buffer(sum(counts))):
+            pygame.draw.lines(self.screen, BLACK, False, curve_points, 1)
+
+        if self.show_intersections:
+            for *_, point in scene_intersections(self.curves):
+                pygame.draw.circle(self.screen, RED, point, POINT_RADIUS, 1)
 
         font = pygame.font.Font(None, 24)
         if self.show_points:
@@ -243,19 +315,36 @@ class Environment():
         self.screen.blit(curve_text, (20, 100))
         point_text_on = font.render(f"Show Support Data: {self.show_points}",  True, "dark green" if self.show_points else "crimson")
         self.screen.blit(point_text_on, (20, 120))
+        intersections_text = font.render(f"Show Intersections: {self.show_intersections}",  True, "dark green" if self.show_intersections else "crimson")
+        self.screen.blit(intersections_text, (20, 140))
+        freehand_text = font.render(f"Freehand Mode: {self.freehand_mode}",  True, "dark green" if self.freehand_mode else "crimson")
+        self.screen.blit(freehand_text, (20, 160))
+        if isinstance(self.active_curve(), Nurb):
+            degree_text = font.render(f"Degree: {self.active_curve().degree}", True, "black")
+            self.screen.blit(degree_text, (20, 180))
         
         pygame.display.flip()
 
-    def main_loop(self):
+    def step(self, events, pos):
+        # one frame: the events since the last one and where the mouse is now
+        for event in events:
+            self.handle_event(event, pos)
+
+        if self.drag_id is not None:
+            self.active_curve().points[self.drag_id, :2] = pos
+        elif self.stroke is not None:
+            self.stroke.add(pos)
+        
+        self.draw()
+
+    def main_loop(self, recorder=None):
         while self.is_running:
-            for event in pygame.event.get():
-                self.handle_event(event)
+            events = pygame.event.get()
+            pos = pygame.mouse.get_pos()
+            if recorder is not None:
+                recorder.record(events, pos)
 
-            if self.drag_id is not None:
-                pos = pygame.mouse.get_pos()
-                self.active_curve().points[self.drag_id] = np.array((*pos, 1, self.active_curve().points[self.drag_id,-1]))
-            
-            self.draw()
+            self.step(events, pos)
             self.clock.tick(60)
     
     def quit(self):
@@ -0,0 +1,148 @@
+from collections import deque
+
+import numpy as np
+
+HISTORY_LIMIT = 1000
+
+
+class PointDelta():
+    # rows of one curve that changed value, as their indices and old/new rows
+    __slots__ = ("curve", "indices", "old", "new")
+
+    def __init__(self, curve, indices, old, new):
+        self.curve, self.indices, self.old, self.new = curve, indices, old, new
+
+    def apply(self, environment, forward):
+        self.curve.points[self.indices] = self.new if forward else self.old
+
+
+class ResizeDelta():
+    # one row inserted into (or removed from) a curve
+    __slots__ = ("curve", "index", "row", "inserted")
+
+    def __init__(self, curve, index, row, inserted):
+        self.curve, self.index, self.row, self.inserted = curve, index, row, inserted
+
+    def apply(self, environment, forward):
+        if self.inserted == forward:
+            self.curve.points = np.insert(self.curve.points, self.index, self.row, axis=0)
+        else:
+            self.curve.points = np.delete(self.curve.points, self.index, axis=0)
+
+
+class ReplaceDelta():
+    # every other change to a curve's points, kept whole (a refit, several rows added at once)
+    __slots__ = ("curve", "old", "new")
+
+    def __init__(self, curve, old, new):
+        self.curve, self.old, self.new = curve, old, new
+
+    def apply(self, environment, forward):
+        self.curve.points = (self.new if forward else self.old).copy()
+
+
+class DegreeDelta():
+    # a NURBS switched degree, its points stay the same
+    __slots__ = ("curve", "old", "new")
+
+    def __init__(self, curve, old, new):
+        self.curve, self.old, self.new = curve, old, new
+
+    def apply(self, environment, forward):
+        self.curve.degree = self.new if forward else self.old
+
+
+class CurvesDelta():
+    # the curve list itself changed (curve added, scene reset), the curve objects are shared, not copied
+    __slots__ = ("old", "new")
+
+    def __init__(self, old, new):
+        self.old, self.new = old, new
+
+    def apply(self, environment, forward):
+        environment.curves = list(self.new if forward else self.old)
+        environment.num_curves = len(environment.curves)
+        environment.active_curve_index = min(environment.active_curve_index, environment.num_curves - 1)
+
+
+def point_deltas(curve, old):
+    '''
+    Smallest delta taking a curve from old to its current points: changed rows when the
+    shape is the same, the single inserted/removed row when it differs by one
+    '''
+    new = curve.points
+    if old.shape == new.shape:
+        indices = np.flatnonzero(np.any(old != new, axis=1))
+        if len(indices) == 0:
+            return None
+        return PointDelta(curve, indices, old[indices], new[indices].copy())
+
+    if abs(len(old) - len(new)) == 1:
+        longer, shorter = (new, old) if len(new) > len(old) else (old, new)
+        common = min(len(shorter), len(longer) - 1)
+        mismatch = np.flatnonzero(np.any(longer[:common] != shorter[:common], axis=1))
+        index = mismatch[0] if len(mismatch) else common
+        if np.array_equal(np.delete(longer, index, axis=0), shorter):
+            return ResizeDelta(curve, index, longer[index].copy(), len(new) > len(old))
+
+    return ReplaceDelta(curve, old, new.copy())
+
+
+class History():
+    '''
+    Undo/redo stacks of edits, each edit a list of deltas. Edits are recorded by taking
+    a snapshot of the curves an operation may touch, running it, and committing: only
+    the rows that actually changed are kept, the snapshot itself is dropped.
+    '''
+
+    def __init__(self, limit=HISTORY_LIMIT):
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = []
+
+    def snapshot(self, curves):
+        return [(curve, curve.points.copy()) for curve in curves]
+
+    def push(self, deltas):
+        if deltas:
+            self.undo_stack.append(deltas)
+            self.redo_stack.clear()
+
+    def commit(self, snapshot):
+        self.push([delta for curve, old in snapshot if (delta := point_deltas(curve, old)) is not None])
+
+    def replace_curves(self, old, new):
+        self.push([CurvesDelta(list(old), list(new))])
+
+    def change_degree(self, curve, degree):
+        if degree != curve.degree:
+            self.push([DegreeDelta(curve, curve.degree, degree)])
+            curve.degree = degree
+
+    def undo(self, environment):
+        if not self.undo_stack:
+            return False
+        deltas = self.undo_stack.pop()
+        for delta in reversed(deltas):
+            delta.apply(environment, False)
+        self.redo_stack.append(deltas)
+        return True
+
+    def redo(self, environment):
+        if not self.redo_stack:
+            return False
+        deltas = self.redo_stack.pop()
+        for delta in deltas:
+            delta.apply(environment, True)
+        self.undo_stack.append(deltas)
+        return True
+
+    def nbytes(self):
+        # memory held by the stored rows
+        total = 0
+        for deltas in (*self.undo_stack, *self.redo_stack):
+            for delta in deltas:
+                for name in ("indices", "old", "new", "row"):
+                    value = getattr(delta, name, None)
+                    if isinstance(value, np.ndarray):
+                        total += value.nbytes
+        return total
@@ -1,7 +1,36 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+# the shared geometry package sits next to this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from environment import Environment
+from recorder import Recorder, load, replay, report
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--record", metavar="FILE", help="save the session's input to FILE")
+parser.add_argument("--replay", metavar="FILE", help="replay FILE headlessly and report frame times")
+parser.add_argument("--timings", metavar="FILE", help="with --replay, write each frame time (ms) to FILE")
 
 if __name__ == "__main__":
+    arguments = parser.parse_args()
+    if arguments.replay:
+        # no window, read at pygame.init
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
     environment = Environment()
 
-    environment.main_loop()
-    environment.quit()
\ No newline at end of file
+    if arguments.replay:
+        times = replay(environment, load(arguments.replay))
+        report(times)
+        if arguments.timings:
+            np.savetxt(arguments.timings, times * 1e3, fmt="%.6f")
+    else:
+        recorder = Recorder(arguments.record) if arguments.record else None
+        environment.main_loop(recorder)
+        if recorder is not None:
+            recorder.close()
+    environment.quit()
@@ -0,0 +1,78 @@
+import json
+import time
+
+import numpy as np
+import pygame
+
+# the events Environment reacts to, by name so recordings survive pygame renumbering them
+EVENT_NAMES = {
+    pygame.QUIT: "quit",
+    pygame.MOUSEBUTTONDOWN: "mouse_down",
+    pygame.MOUSEBUTTONUP: "mouse_up",
+    pygame.KEYUP: "key_up",
+    pygame.VIDEORESIZE: "resize",
+}
+EVENT_TYPES = {name: event_type for event_type, name in EVENT_NAMES.items()}
+
+
+class Recorder():
+    '''
+    Writes a session to a JSON lines file, one line per frame:
+    {"time": seconds since the start, "mouse": [x, y], "events": [{"type": "key_up", "key": 100}, ...]}
+    Only the fields the editor reads are kept (key for keys, size for resizes).
+    '''
+
+    def __init__(self, path):
+        self.file = open(path, "w")
+        self.start = time.perf_counter()
+
+    def record(self, events, pos):
+        recorded = []
+        for event in events:
+            if event.type not in EVENT_NAMES:
+                continue
+            entry = {"type": EVENT_NAMES[event.type]}
+            if event.type == pygame.KEYUP:
+                entry["key"] = event.key
+            elif event.type == pygame.VIDEORESIZE:
+                entry["size"] = list(event.size)
+            recorded.append(entry)
+        frame = {"time": round(time.perf_counter() - self.start, 6), "mouse": list(pos), "events": recorded}
+        self.file.write(json.dumps(frame) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+def load(path):
+    # frames as (events, mouse position), events rebuilt as pygame events
+    frames = []
+    with open(path) as file:
+        for line in file:
+            frame = json.loads(line)
+            events = [pygame.event.Event(EVENT_TYPES[entry.pop("type")], entry) for entry in frame["events"]]
+            frames.append((events, tuple(frame["mouse"])))
+    return frames
+
+
+def replay(environment, frames):
+    '''
+    Feeds a recording back through Environment.step as fast as it goes (no frame cap)
+    and returns how long each frame took, in seconds
+    '''
+    times = np.empty(len(frames))
+    for index, (events, pos) in enumerate(frames):
+        start = time.perf_counter()
+        environment.step(events, pos)
+        times[index] = time.perf_counter() - start
+        if not environment.is_running:
+            return times[:index + 1]
+    return times
+
+
+def report(times):
+    milliseconds = times * 1e3
+    print(f"frames: {len(times)}")
+    print(f"total: {np.sum(milliseconds):.1f} ms")
+    print(f"mean: {np.mean(milliseconds):.3f} ms  median: {np.median(milliseconds):.3f} ms")
+    print(f"p95: {np.percentile(milliseconds, 95):.3f} ms  p99: {np.percentile(milliseconds, 99):.3f} ms  max: {np.max(milliseconds):.3f} ms")
@@ -1,5 +1,6 @@
 import pygame
 import numpy as np
+from geometry import *
 
 SCREEN_SIZE = (1000, 600)
 POINT_RADIUS = 5
@@ -7,9 +8,9 @@ GREY = pygame.color.Color(150, 150, 150, 1)
 WHITE = pygame.color.Color(255, 255, 255, 255)
 RED = pygame.color.Color(255, 0, 0, 255)
 BLACK = pygame.color.Color(0, 0, 0, 0)
-K = 4 
+NUM_SAMPLES = 200 # step size = 0.005
 
-class Enviroment:
+class Environment:
     def __init__(self):
         if not pygame.get_init():
             pygame.init()
@@ -18,103 +19,32 @@ class Enviroment:
         self.clock = pygame.time.Clock()
         self.running = True
         self.drag_id = None
-        self.points = np.empty((0,4))
-        self.knots = np.empty((0,1))
+        self.curve = Nurb()
+        self.curve_points = np.empty((NUM_SAMPLES, 2))
         self.create = True
         self.weight_mode = False
-    
-    def knot_vector(self):
-        '''
-        For an open nonuniform curve that interpolated the end points, the t_j (knot value) are calculated using K: (Mortensen, 2006)
-        t_j = 0 if j < K
-        t_j = i - K + 1 if K <= j <= n -> i = j?
-        t_j = n - K + 2 if j > n
-        '''
-        knot_vector = np.empty((0,1))
-
-        while len(knot_vector) < K:
-            knot_vector = np.insert(knot_vector, len(knot_vector), 0)       
-        while len(knot_vector) <= len(self.points):
-            knot_vector = np.insert(knot_vector, len(knot_vector), len(knot_vector) - K + 1)        
-        while len(knot_vector) <= len(self.points) + K:
-            knot_vector = np.insert(knot_vector, len(knot_vector), len(self.points) - K + 2)
-        return knot_vector
-
-    def normalized_knot(self):
-        # knot_vector [0,1]
-        min_val = np.min(self.knots)
-        max_val = np.max(self.knots)
-        
-        normalized_knots = (self.knots - min_val) / (max_val - min_val)
-        return normalized_knots
-
-    def deboor(self, param_u, point_index, degree):
-        '''
-        Cox-deBoor (Foley, 1990):
-        Bk,0 (u) = 1 if u_k <= u <= u_k+1
-                 = 0 otherwise
-        Bk,d(u) = (((u - u_k) / (u_(k+d) - u_k)) * Bk,d-1(u)) + (((u_(k+d+1) - u) / (u_(k+d+1) - u_(k+1))) * Bk+1,d-1(u))
-        '''
-        
-        if degree == 0:
-            if param_u >= self.knots[point_index] and param_u < self.knots[point_index + 1]:
-                return 1
-            else:
-                return 0
-            
-        # treating */0 division = 0
-        if self.knots[point_index + degree] != 0:
-            first_deboor = self.deboor(param_u, point_index, degree - 1)
-            first = ((param_u - self.knots[point_index]) / (self.knots[point_index + degree])) * first_deboor
-        else:
-            first = 0
-        if (self.knots[point_index + degree + 1] - self.knots[point_index + 1]) != 0:
-            second_deboor = self.deboor(param_u, point_index + 1, degree - 1)
-            second = ((self.knots[point_index + degree + 1] - param_u) / (self.knots[point_index + degree + 1] - self.knots[point_index + 1])) * second_deboor
-        else:
-            second = 0
-        
-        return first + second
-    
-    def nurbs(self, param_u):
-        '''
-        NURBS (Mortensen, 2006):
-        p(u) = (sum i=0~n (h_i * p_i * Ni,k(u))) / (sum i=0~n (h_i * Ni,k(u)))
-
-        h = weight
-        p = control point
-        n = num control points
-        Ni,k = nonuniform B-spline basis function (cox deboor)
-        '''
-        first = 0
-        second = 0
-
-        for point_index in range(len(self.points)):
-            deboor_1 = self.deboor(param_u, point_index, K)
-            first = first + self.points[point_index,-1]*self.points[point_index,:-2]*deboor_1
-        for point_index in range(len(self.points)):
-            deboor_2 = self.deboor(param_u, point_index, K)
-            second = second + self.points[point_index,-1]*deboor_2
-
-        return first / second
+
+    @property
+    def points(self):
+        return self.curve.points
+
+    @points.setter
+    def points(self, points):
+        self.curve.points = points
 
     def draw(self):
         self.screen.fill(WHITE)
 
         for point in self.points:
             pygame.draw.circle(self.screen, BLACK, point[:-2], POINT_RADIUS)
-        
+
         for point1, point2 in ((p1, self.points[p1_index + 1]) for p1_index, p1 in enumerate(self.points[:-1])):
             pygame.draw.line(self.screen, GREY, point1[:-2], point2[:-2], 1)
-        
+
         n = len(self.points)
-        if n >= K:
-            self.knots = self.knot_vector()
-            self.knots = self.normalized_knot()
-            curve_points = []
-            for t in np.arange(0, 1, 0.005):  #step size = 0.01
-                x, y = self.nurbs(t)
-                curve_points.append((x, y))
+        if n > self.curve.degree:
+            # knots and basis come from the shared cache, only the control points are new each frame
+            curve_points = self.curve.create_curve(NUM_SAMPLES, out=self.curve_points)
             pygame.draw.lines(self.screen, RED, False, curve_points, 2)
 
         font = pygame.font.Font(None, 24)
@@ -126,7 +56,7 @@ class Enviroment:
             for (x, y, z, w) in self.points:
                 text = font.render(f"P({w})", True, BLACK)
                 self.screen.blit(text, (x, y))
-            
+
         pygame.display.flip()
 
     def handle_event(self, event):
@@ -143,14 +73,14 @@ class Enviroment:
     def click_on_point(self, pos):
         if not self.points.any():
             return None
-        
+
         np_pos = np.array([pos,])
         distances = np.array(np.sqrt(np.sum(np.square(np.subtract(np_pos, self.points[:, :-2])), axis=1)))
 
         if len(indexes := np.argwhere(distances < 2 * POINT_RADIUS)) > 0:
             rindex = indexes[0,0]
             return rindex + (0 if self.drag_id is None else 0 if self.drag_id > rindex else 1)
-        
+
         return None
 
     def handle_event_mouse_up(self, pos):
@@ -182,7 +112,11 @@ class Enviroment:
                 self.create = not self.create
             case pygame.K_w:
                 self.weight_mode = not self.weight_mode
-                
+            case pygame.K_MINUS | pygame.K_KP_MINUS:
+                self.curve.degree = max(self.curve.degree - 1, 1)
+            case pygame.K_EQUALS | pygame.K_PLUS | pygame.K_KP_PLUS:
+                self.curve.degree = min(self.curve.degree + 1, 5)
+
 
     def main_loop(self):
         while self.running:
@@ -190,12 +124,11 @@ class Enviroment:
                 self.handle_event(event)
 
             if self.drag_id is not None:
-                pos = pygame.mouse.get_pos()
-                self.points[self.drag_id] = np.array((*pos, 1, self.points[self.drag_id,-1]))
-            
+                self.points[self.drag_id, :2] = pygame.mouse.get_pos()
+
             self.draw()
             self.clock.tick(60)
 
     def quit(self):
         if pygame.get_init():
-            pygame.quit()
\ No newline at end of file
+            pygame.quit()
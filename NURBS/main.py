@@ -1,7 +1,13 @@
-from curve import Enviroment
+import os
+import sys
+
+# the shared geometry package sits next to this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from environment import Environment
 
 if __name__ == "__main__":
-    env = Enviroment()
+    env = Environment()
 
     env.main_loop()
     env.quit()
@@ -0,0 +1,5 @@
+from .backend import get_backend, set_backend
+from .curve import *
+from .export import write_binary, write_gcode, write_obj
+from .intersection import intersect, scene_intersections, self_intersect
+from .surface import NurbSurface
@@ -0,0 +1,188 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+from scipy.spatial import ConvexHull, QhullError
+
+from .backend import BACKENDS, set_backend
+from .curve import *
+from .surface import NurbSurface
+
+TOLERANCE = 1e-9  # relative to the size of the control polygon
+SURFACE_SAMPLES = 12  # per direction, the recursive reference is a double loop
+
+
+def random_curve(kind, rng):
+    n = int(rng.integers(2, 13))
+    curve = kind()
+    curve.points = np.column_stack((rng.uniform(0, 1000, (n, 2)), np.ones(n), rng.uniform(1, 5, n)))
+    if kind is Nurb:
+        curve.degree = int(rng.integers(1, 6))
+    return curve
+
+
+def random_surface(rng):
+    n_u, n_v = rng.integers(2, 8, 2)
+    points = np.concatenate((rng.uniform(0, 1000, (n_u, n_v, 3)), rng.uniform(1, 5, (n_u, n_v, 1))), axis=2)
+    return NurbSurface(points, int(rng.integers(1, 6)), int(rng.integers(1, 6)))
+
+
+def reference(curve, u):
+    # the recursive implementations, point by point
+    if isinstance(curve, Nurb):
+        knots = curve.normalized_knot(curve.knot_vector())
+        return np.array([curve.nurbs(t, knots) for t in u])
+    n = len(curve.points)
+    return np.array([sum(curve.bernstein(t, n - 1, i) * curve.points[i, :2] for i in range(n)) for t in u])
+
+
+def create_curve(curve, u):
+    return curve.create_curve(len(u), out=np.empty((len(u), 2)))
+
+
+def evaluate(curve, u):
+    return get_backend().evaluate(curve.knots(), curve.order() - 1, curve.homogeneous(), u)
+
+
+def extraction(curve, u):
+    return curve.evaluate(u)
+
+
+def chunked(curve, u):
+    # small chunks, so runs and pieces get cut at chunk edges
+    return np.concatenate(list(curve.chunks(len(u), chunk_size=37)) or [np.empty((0, 2))])
+
+
+def batched(curve, u):
+    # alone and between two other curves of the same shape, so the stacked product is exercised
+    other = type(curve)()
+    other.degree = curve.degree
+    other.points = curve.points[::-1].copy()
+    return create_curves([other, curve, other], [len(u)] * 3)[1]
+
+
+def bezier(curve, u):
+    return get_backend().bezier(curve.homogeneous(), u)
+
+
+# name, curve type, whether it takes any u (or only the uniform grid create_curve samples), function
+MODES = [
+    ("create_curve", Nurb, False, create_curve),
+    ("evaluate", Nurb, True, evaluate),
+    ("extraction", Nurb, True, extraction),
+    ("chunks", Nurb, False, chunked),
+    ("batched", Nurb, False, batched),
+    ("create_curve", Bezier, False, create_curve),
+    ("bezier", Bezier, True, bezier),
+    ("extraction", Bezier, True, extraction),
+    ("chunks", Bezier, False, chunked),
+    ("batched", Bezier, False, batched),
+]
+
+
+def hull_violation(points, control):
+    # how far outside the convex hull of the control points the samples get, 0 when inside
+    try:
+        hull = ConvexHull(control)
+    except QhullError:
+        return 0.0
+    distances = points @ hull.equations[:, :-1].T + hull.equations[:, -1]
+    return max(0.0, float(np.max(distances)))
+
+
+def basis_invariants(curve, rng, samples):
+    # partition of unity of the backend basis and the recursive deboor, worst deviation from 1
+    knots = curve.normalized_knot(curve.knot_vector())
+    degree = curve.order() - 1
+    u = np.concatenate(([0, 1], rng.uniform(0, 1, samples)))
+    backend = np.abs(curve.basis(curve.find_span(u, knots), u, knots).sum(axis=1) - 1).max()
+    recursive = max(abs(sum(curve.deboor(t, i, degree, knots) for i in range(len(curve.points))) - 1) for t in u[:16])
+    return max(backend, recursive)
+
+
+def new_row():
+    return {"error": 0.0, "speedups": [], "ends": 0.0, "hull": 0.0}
+
+
+def run(trials=20, samples=200, seed=0):
+    '''
+    Compares every backend and evaluation mode with the recursive reference on random
+    control polygons, weights, degrees and sample grids (and surfaces on random control
+    grids), and checks partition of unity, end point interpolation and convex hull containment. Returns the number of failures.
+    '''
+    rng = np.random.default_rng(seed)
+    rows = {}
+    failures = 0
+
+    for _ in range(trials):
+        for kind in (Nurb, Bezier):
+            curve = random_curve(kind, rng)
+            control = curve.points[:, :2]
+            scale = np.max(np.abs(control))
+            grids = {False: np.linspace(0, 1, samples), True: np.sort(rng.uniform(0, 1, samples))}
+            expected, reference_time = {}, {}
+            for any_u, u in grids.items():
+                start = time.perf_counter()
+                expected[any_u] = reference(curve, u)
+                reference_time[any_u] = time.perf_counter() - start
+
+            for name in BACKENDS:
+                set_backend(name)
+                if kind is Nurb:
+                    row = rows.setdefault((kind.__name__, "unity", name), new_row())
+                    row["error"] = max(row["error"], basis_invariants(curve, rng, samples))
+                for mode, mode_kind, any_u, function in MODES:
+                    if mode_kind is not kind:
+                        continue
+                    u = grids[any_u]
+                    function(curve, u)  # fills caches, compiles numba
+                    start = time.perf_counter()
+                    points = function(curve, u)
+                    elapsed = time.perf_counter() - start
+
+                    row = rows.setdefault((kind.__name__, mode, name), new_row())
+                    row["error"] = max(row["error"], np.max(np.abs(points - expected[any_u])) / scale)
+                    row["speedups"].append(reference_time[any_u] / elapsed)
+                    if not any_u:
+                        row["ends"] = max(row["ends"], np.max(np.abs(points[[0, -1]] - control[[0, -1]])) / scale)
+                    row["hull"] = max(row["hull"], hull_violation(points, control) / scale)
+
+        # surfaces evaluate with two plain numpy products whatever the backend
+        surface = random_surface(rng)
+        control = surface.points[..., :3]
+        scale = np.max(np.abs(control))
+        start = time.perf_counter()
+        expected = surface.reference_surface(SURFACE_SAMPLES, SURFACE_SAMPLES)
+        reference_time = time.perf_counter() - start
+        surface.create_surface(SURFACE_SAMPLES, SURFACE_SAMPLES)
+        start = time.perf_counter()
+        points = surface.create_surface(SURFACE_SAMPLES, SURFACE_SAMPLES)
+        elapsed = time.perf_counter() - start
+
+        row = rows.setdefault(("Surface", "create_surface", "numpy"), new_row())
+        row["error"] = max(row["error"], np.max(np.abs(points - expected)) / scale)
+        row["speedups"].append(reference_time / elapsed)
+        corners = (0, 0, -1, -1), (0, -1, 0, -1)
+        row["ends"] = max(row["ends"], np.max(np.abs(points[corners] - control[corners])) / scale)
+        row["hull"] = max(row["hull"], hull_violation(points.reshape(-1, 3), control.reshape(-1, 3)) / scale)
+    set_backend()
+
+    # errors are relative to the control polygon size, "unity" rows hold |sum N_i - 1|
+    print(f"{'curve':>8} {'mode':>14} {'backend':>8} {'max error':>10} {'speedup':>9} {'end error':>10} {'hull':>9}")
+    for (kind, mode, name), row in rows.items():
+        failed = max(row["error"], row["ends"], row["hull"]) > TOLERANCE
+        failures += failed
+        speedup = f"{np.median(row['speedups']):>9.1f}" if row["speedups"] else f"{'-':>9}"
+        print(f"{kind:>8} {mode:>14} {name:>8} {row['error']:>10.1e} {speedup} {row['ends']:>10.1e} {row['hull']:>9.1e}"
+              + ("  FAIL" if failed else ""))
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+    sys.exit(1 if run(arguments.trials, arguments.samples, arguments.seed) else 0)
@@ -0,0 +1,474 @@
+import os
+
+import numpy as np
+from scipy.special import comb
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# numpy, numba, or auto (numba when it is installed)
+BACKEND_VARIABLE = "OMOG_BACKEND"
+MAX_FORWARD_DEGREE = 5  # Bezier pieces above this are evaluated exactly instead of forward differenced
+MAX_ARRAY_FORWARD_DEGREE = 3  # the same for NumpyBackend, where a run redone in halves costs a whole pass
+
+
+class NumpyBackend():
+    '''
+    Span, basis and evaluation kernels over whole parameter arrays. Control points are
+    homogeneous (w*x, w*y, w), knots are the normalized knot vector.
+    '''
+    name = "numpy"
+
+    def find_span(self, knots, degree, u):
+        '''
+        Knot span index (Piegl & Tiller, 1997, A2.1):
+        the i with t_i <= u < t_i+1, the last non-empty span is closed at u = 1
+        '''
+        return np.clip(np.searchsorted(knots, u, side="right") - 1, degree, len(knots) - degree - 2)
+
+    def basis(self, knots, degree, span, u):
+        '''
+        Non-vanishing basis functions N_span-p,p(u) ... N_span,p(u) (Piegl & Tiller, 1997, A2.2),
+        the triangular form of Cox-deBoor with
+        left_j = u - t_span+1-j
+        right_j = t_span+j - u
+        outside its span the result is the span's polynomial piece extended
+        '''
+        u = np.asarray(u, dtype=float)
+        span = np.broadcast_to(span, u.shape)
+        values = np.zeros(u.shape + (degree + 1,))
+        values[..., 0] = 1
+        left = np.empty_like(values)
+        right = np.empty_like(values)
+        for j in range(1, degree + 1):
+            left[..., j] = u - knots[span + 1 - j]
+            right[..., j] = knots[span + j] - u
+            saved = 0
+            for r in range(j):
+                temp = values[..., r] / (right[..., r + 1] + left[..., j - r])
+                values[..., r] = saved + right[..., r + 1] * temp
+                saved = left[..., j - r] * temp
+            values[..., j] = saved
+        return values
+
+    def evaluate(self, knots, degree, control, u):
+        '''
+        NURBS (Piegl & Tiller, 1997, A4.1): C^w(u) = sum N_i,p(u) P^w_i over the p+1 points of the span,
+        then C(u) = (w*x, w*y) / w
+        '''
+        span = self.find_span(knots, degree, u)
+        values = self.basis(knots, degree, span, u)
+        indices = span[:, None] - degree + np.arange(degree + 1)
+        weighted = np.einsum("mi,mic->mc", values, control[indices])
+        return weighted[:, :2] / weighted[:, 2:]
+
+    def evaluate_basis(self, indices, values, control, out, scratch):
+        '''
+        Same sum with spans and basis values computed beforehand. indices and values are
+        (p+1, m), control is (3, n) and the two scratch arrays (3, m), one contiguous row per
+        coordinate: 1-D ufuncs with out= don't buffer, broadcast ones do. Writes into out
+        (m, 2), nothing is allocated per call
+        '''
+        weighted, gathered = scratch
+        weighted.fill(0)
+        for i in range(len(indices)):
+            for c in range(3):
+                np.take(control[c], indices[i], out=gathered[c], mode="clip")
+                np.multiply(gathered[c], values[i], out=gathered[c])
+                np.add(weighted[c], gathered[c], out=weighted[c])
+        np.divide(weighted[0], weighted[2], out=out[:, 0])
+        np.divide(weighted[1], weighted[2], out=out[:, 1])
+        return out
+
+    def bezier(self, control, u):
+        '''
+        Bernstein form B(u) = sum b_v,n(u) B_v, all samples at once
+        '''
+        n = len(control) - 1
+        v = np.arange(n + 1)
+        u = np.asarray(u, dtype=float)[:, None]
+        bernstein = comb(n, v) * u ** v * (1 - u) ** (n - v)
+        return bernstein @ control[:, :2]
+
+    def evaluate_bernstein(self, bernstein, control, out):
+        # precomputed (m, n+1) Bernstein matrix times the (n+1, 2) control points, into out
+        return np.matmul(bernstein, control, out=out)
+
+    def evaluate_batch(self, indices, values, matrix, points, out, workspace):
+        '''
+        evaluate_basis for a stack of curves (curves, n, 4) sharing one basis, into out
+        (curves, m, 2): the basis as the dense read only (m, n) matrix, homogeneous control
+        (curves, n, 3) and its product (curves, m, 3) in workspace, so nothing is allocated
+        '''
+        control, h = workspace
+        np.multiply(points[..., 0], points[..., 3], out=control[..., 0])
+        np.multiply(points[..., 1], points[..., 3], out=control[..., 1])
+        np.copyto(control[..., 2], points[..., 3])
+        np.matmul(matrix, control, out=h)
+        np.divide(h[..., 0], h[..., 2], out=out[..., 0])
+        np.divide(h[..., 1], h[..., 2], out=out[..., 1])
+        return out
+
+    def evaluate_bernstein_batch(self, bernstein, points, out):
+        # evaluate_bernstein for a stack of curves (curves, n+1, 4), into out (curves, m, 2)
+        return np.matmul(bernstein, points[..., :2], out=out)
+
+    def homogeneous_bezier(self, control, segment, t):
+        # rational_bezier before the divide, the (x w, y w, w) of every sample
+        degree = control.shape[1] - 1
+        v = np.arange(degree + 1)
+        t = np.asarray(t, dtype=float)[:, None]
+        bernstein = comb(degree, v) * t ** v * (1 - t) ** (degree - v)
+        return np.einsum("kv,kvc->kc", bernstein, control[segment])
+
+    def rational_bezier(self, control, segment, t):
+        '''
+        Rational Bezier pieces (E, p+1, 3) in homogeneous form, sample k on piece segment[k] at local t[k]:
+        C(t) = sum b_v,p(t) w_v B_v / sum b_v,p(t) w_v
+        '''
+        h = self.homogeneous_bezier(control, segment, t)
+        return h[:, :2] / h[:, 2:]
+
+    def forward_differences(self, control, breaks, starts, step, first, anchor, tolerance, out):
+        '''
+        Samples k*step, k = first...first+len(out), of the pieces (E, p+1, 3), piece e covering
+        samples starts[e]..starts[e+1], into out, by forward differencing runs of at most
+        anchor samples. All runs step at once: run r is row r of a (runs, anchor, 3) array and
+        every difference level is one cumulative sum along the rows. A run whose last
+        sample is further than tolerance from the exact one is redone as two halves.
+        Pieces above MAX_ARRAY_FORWARD_DEGREE are evaluated exactly. Returns the largest accepted drift.
+        '''
+        last = first + len(out)
+        width = np.diff(breaks)
+        if control.shape[1] - 1 > MAX_ARRAY_FORWARD_DEGREE:
+            k = np.arange(first, last)
+            segment = np.searchsorted(starts, k, side="right") - 1
+            out[:] = self.rational_bezier(control, segment, (k * step - breaks[segment]) / width[segment])
+            return 0.0
+        # the runs of every piece within the chunk, the run length starts from anchor in every piece
+        lo, hi = np.clip(starts[:-1], first, last), np.clip(starts[1:], first, last)
+        runs = -(-(hi - lo) // anchor)
+        piece = np.repeat(np.arange(len(runs)), runs)
+        begin = lo[piece] + (np.arange(len(piece)) - np.repeat(np.cumsum(runs) - runs, runs)) * anchor
+        length = np.minimum(anchor, hi[piece] - begin)
+        drift = 0.0
+        while len(piece):
+            error = self.step_runs(control, breaks, width, step, first, piece, begin, length, out)
+            redo = (error > tolerance) & (length > 1)
+            drift = max(drift, error[~redo].max(initial=0.0))
+            half = length[redo] // 2
+            piece = np.repeat(piece[redo], 2)
+            begin = np.column_stack((begin[redo], begin[redo] + half)).ravel()
+            length = np.column_stack((half, length[redo] - half)).ravel()
+        return drift
+
+    def step_runs(self, control, breaks, width, step, first, piece, begin, length, out):
+        # one pass of forward_differences over the runs, returns how far each run's last sample drifted
+        degree = control.shape[1] - 1
+        h = step / width[piece]
+        t0 = (begin * step - breaks[piece]) / width[piece]
+        t = (t0[:, None] + np.arange(degree + 1) * h[:, None]).ravel()
+        # p+1 exact values, then table[:, j] is the j-th forward difference at t0
+        table = self.homogeneous_bezier(control, np.repeat(piece, degree + 1), t).reshape(len(piece), degree + 1, 3)
+        for j in range(1, degree + 1):
+            table[:, j:] -= table[:, j - 1:-1]
+        # level j at step s is level j at s-1 plus level j+1 at s-1, P_k+1 = P_k + dP_k, ...
+        # level j sits at columns j...j+steps, so it is table[:, j] followed by level j+1 and one
+        # cumulative sum in place steps it
+        steps = length.max()
+        level = np.empty((len(piece), steps + degree, 3))
+        level[:, degree:] = table[:, degree, None]
+        for j in range(degree - 1, -1, -1):
+            level[:, j] = table[:, j]
+            np.cumsum(level[:, j:j + steps], axis=1, out=level[:, j:j + steps])
+        level = level[:, :steps]
+
+        inside = np.arange(steps) < length[:, None]
+        samples = level[inside]
+        if length.sum() == len(out):  # the runs tile out in order, no scatter needed
+            np.divide(samples[:, :2], samples[:, 2:], out=out)
+        else:
+            out[(begin[:, None] + np.arange(steps))[inside] - first] = samples[:, :2] / samples[:, 2:]
+        end = level[np.arange(len(piece)), length - 1]
+        exact = self.rational_bezier(control, piece, t0 + (length - 1) * h)
+        return np.abs(end[:, :2] / end[:, 2:] - exact).max(axis=1)
+
+if numba is not None:
+
+    @numba.njit(cache=True)
+    def _find_span(knots, degree, u):
+        last = len(knots) - degree - 2
+        if u >= knots[last + 1]:
+            return last
+        if u <= knots[degree]:
+            return degree
+        low, high = degree, last + 1
+        middle = (low + high) // 2
+        while u < knots[middle] or u >= knots[middle + 1]:
+            if u < knots[middle]:
+                high = middle
+            else:
+                low = middle
+            middle = (low + high) // 2
+        return middle
+
+    @numba.njit(cache=True)
+    def _basis(knots, degree, span, u, values, left, right):
+        values[0] = 1.0
+        for j in range(1, degree + 1):
+            left[j] = u - knots[span + 1 - j]
+            right[j] = knots[span + j] - u
+            saved = 0.0
+            for r in range(j):
+                temp = values[r] / (right[r + 1] + left[j - r])
+                values[r] = saved + right[r + 1] * temp
+                saved = left[j - r] * temp
+            values[j] = saved
+
+    @numba.njit(cache=True)
+    def _find_spans(knots, degree, u):
+        spans = np.empty(len(u), dtype=np.int64)
+        for k in range(len(u)):
+            spans[k] = _find_span(knots, degree, u[k])
+        return spans
+
+    @numba.njit(cache=True)
+    def _basis_all(knots, degree, spans, u):
+        values = np.empty((len(u), degree + 1))
+        left = np.empty(degree + 1)
+        right = np.empty(degree + 1)
+        for k in range(len(u)):
+            _basis(knots, degree, spans[k], u[k], values[k], left, right)
+        return values
+
+    @numba.njit(cache=True)
+    def _evaluate(knots, degree, control, u):
+        out = np.empty((len(u), 2))
+        values = np.empty(degree + 1)
+        left = np.empty(degree + 1)
+        right = np.empty(degree + 1)
+        for k in range(len(u)):
+            span = _find_span(knots, degree, u[k])
+            _basis(knots, degree, span, u[k], values, left, right)
+            x = y = w = 0.0
+            for i in range(degree + 1):
+                point = control[span - degree + i]
+                x += values[i] * point[0]
+                y += values[i] * point[1]
+                w += values[i] * point[2]
+            out[k, 0] = x / w
+            out[k, 1] = y / w
+        return out
+
+    @numba.njit(cache=True)
+    def _evaluate_basis(indices, values, control, out):
+        for k in range(out.shape[0]):
+            x = y = w = 0.0
+            for i in range(indices.shape[0]):
+                j = indices[i, k]
+                x += values[i, k] * control[0, j]
+                y += values[i, k] * control[1, j]
+                w += values[i, k] * control[2, j]
+            out[k, 0] = x / w
+            out[k, 1] = y / w
+        return out
+
+    @numba.njit(cache=True)
+    def _evaluate_bernstein(bernstein, control, out):
+        for k in range(out.shape[0]):
+            x = y = 0.0
+            for i in range(bernstein.shape[1]):
+                x += bernstein[k, i] * control[i, 0]
+                y += bernstein[k, i] * control[i, 1]
+            out[k, 0] = x
+            out[k, 1] = y
+        return out
+
+    @numba.njit(cache=True)
+    def _bezier(control, u):
+        # de Casteljau's algorithm, one triangle per sample
+        n = len(control)
+        out = np.empty((len(u), 2))
+        level = np.empty((n, 2))
+        for k in range(len(u)):
+            for i in range(n):
+                level[i, 0] = control[i, 0]
+                level[i, 1] = control[i, 1]
+            for r in range(1, n):
+                for i in range(n - r):
+                    level[i, 0] = (1 - u[k]) * level[i, 0] + u[k] * level[i + 1, 0]
+                    level[i, 1] = (1 - u[k]) * level[i, 1] + u[k] * level[i + 1, 1]
+            out[k, 0] = level[0, 0]
+            out[k, 1] = level[0, 1]
+        return out
+
+
+    @numba.njit(cache=True)
+    def _evaluate_batch(indices, values, points, out):
+        for g in range(points.shape[0]):
+            for k in range(out.shape[1]):
+                x = y = w = 0.0
+                for i in range(indices.shape[0]):
+                    j = indices[i, k]
+                    b = values[i, k] * points[g, j, 3]
+                    x += b * points[g, j, 0]
+                    y += b * points[g, j, 1]
+                    w += b
+                out[g, k, 0] = x / w
+                out[g, k, 1] = y / w
+        return out
+
+    @numba.njit(cache=True)
+    def _evaluate_bernstein_batch(bernstein, points, out):
+        for g in range(points.shape[0]):
+            _evaluate_bernstein(bernstein, points[g], out[g])
+        return out
+
+    @numba.njit(cache=True)
+    def _rational_bezier(control, segment, t):
+        # de Casteljau on the homogeneous polygon of each sample's piece, the pieces are independent
+        n = control.shape[1]
+        out = np.empty((len(t), 2))
+        level = np.empty((n, 3))
+        for k in range(len(t)):
+            for i in range(n):
+                for c in range(3):
+                    level[i, c] = control[segment[k], i, c]
+            for r in range(1, n):
+                for i in range(n - r):
+                    for c in range(3):
+                        level[i, c] = (1 - t[k]) * level[i, c] + t[k] * level[i + 1, c]
+            out[k, 0] = level[0, 0] / level[0, 2]
+            out[k, 1] = level[0, 1] / level[0, 2]
+        return out
+
+
+    @numba.njit(cache=True)
+    def _homogeneous_point(control, t, level, point):
+        # de Casteljau on one homogeneous polygon, into point
+        n = control.shape[0]
+        for i in range(n):
+            for c in range(3):
+                level[i, c] = control[i, c]
+        for r in range(1, n):
+            for i in range(n - r):
+                for c in range(3):
+                    level[i, c] = (1 - t) * level[i, c] + t * level[i + 1, c]
+        for c in range(3):
+            point[c] = level[0, c]
+
+    @numba.njit(cache=True)
+    def _forward_differences(control, breaks, starts, step, first, anchor, tolerance, out):
+        n = control.shape[1]
+        table = np.empty((n, 3))
+        level = np.empty((n, 3))
+        exact = np.empty(3)
+        drift = 0.0
+        last = first + out.shape[0]
+        for e in range(control.shape[0]):
+            width = breaks[e + 1] - breaks[e]
+            h = step / width
+            k = max(starts[e], first)
+            end = min(starts[e + 1], last)
+            if n - 1 > MAX_FORWARD_DEGREE:
+                # high degree runs drift after a few steps, de Casteljau every sample instead
+                for s in range(k, end):
+                    _homogeneous_point(control[e], (s * step - breaks[e]) / width, level, exact)
+                    out[s - first, 0] = exact[0] / exact[2]
+                    out[s - first, 1] = exact[1] / exact[2]
+                continue
+            run = anchor  # every piece starts from the full run length
+            while k < end:
+                count = min(run, end - k)
+                t0 = (k * step - breaks[e]) / width
+                for i in range(n):
+                    _homogeneous_point(control[e], t0 + i * h, level, table[i])
+                # in place, table[j] ends up as the j-th forward difference at t0
+                for j in range(1, n):
+                    for i in range(n - 1, j - 1, -1):
+                        for c in range(3):
+                            table[i, c] -= table[i - 1, c]
+                for s in range(count):
+                    inverse = 1.0 / table[0, 2]
+                    out[k - first + s, 0] = table[0, 0] * inverse
+                    out[k - first + s, 1] = table[0, 1] * inverse
+                    for j in range(n - 1):
+                        for c in range(3):
+                            table[j, c] += table[j + 1, c]
+
+                _homogeneous_point(control[e], t0 + (count - 1) * h, level, exact)
+                error = max(abs(out[k - first + count - 1, 0] - exact[0] / exact[2]),
+                            abs(out[k - first + count - 1, 1] - exact[1] / exact[2]))
+                if error > tolerance and run > 1:
+                    run = run // 2
+                    continue
+                drift = max(drift, error)
+                k += count
+        return drift
+
+class NumbaBackend(NumpyBackend):
+    '''
+    The same kernels compiled with numba, one loop over the samples instead of array passes
+    '''
+    name = "numba"
+
+    def find_span(self, knots, degree, u):
+        u = np.asarray(u, dtype=float)
+        return _find_spans(knots, degree, u.ravel()).reshape(u.shape)
+
+    def basis(self, knots, degree, span, u):
+        u = np.asarray(u, dtype=float)
+        span = np.broadcast_to(span, u.shape)
+        values = _basis_all(knots, degree, np.ascontiguousarray(span, dtype=np.int64).ravel(), u.ravel())
+        return values.reshape(u.shape + (degree + 1,))
+
+    def evaluate(self, knots, degree, control, u):
+        return _evaluate(knots, degree, np.ascontiguousarray(control, dtype=float), np.asarray(u, dtype=float))
+
+    def evaluate_basis(self, indices, values, control, out, scratch):
+        return _evaluate_basis(indices, values, control, out)
+
+    def bezier(self, control, u):
+        return _bezier(np.ascontiguousarray(control[:, :2], dtype=float), np.asarray(u, dtype=float))
+
+    def evaluate_bernstein(self, bernstein, control, out):
+        return _evaluate_bernstein(bernstein, control, out)
+
+    def evaluate_batch(self, indices, values, matrix, points, out, workspace):
+        return _evaluate_batch(indices, values, points, out)
+
+    def evaluate_bernstein_batch(self, bernstein, points, out):
+        return _evaluate_bernstein_batch(bernstein, points, out)
+
+    def rational_bezier(self, control, segment, t):
+        return _rational_bezier(np.ascontiguousarray(control, dtype=float), np.asarray(segment, dtype=np.int64),
+                                np.asarray(t, dtype=float))
+
+    def forward_differences(self, control, breaks, starts, step, first, anchor, tolerance, out):
+        return _forward_differences(np.ascontiguousarray(control, dtype=float), breaks, starts.astype(np.int64),
+                                    step, first, anchor, tolerance, out)
+
+
+BACKENDS = {"numpy": NumpyBackend}
+if numba is not None:
+    BACKENDS["numba"] = NumbaBackend
+
+_backend = None
+
+
+def set_backend(name="auto"):
+    global _backend
+    if name == "auto":
+        name = "numba" if "numba" in BACKENDS else "numpy"
+    if name not in BACKENDS:
+        raise ValueError("Unknown backend " + name + ", available: " + ", ".join(BACKENDS))
+    _backend = BACKENDS[name]()
+    return _backend
+
+
+def get_backend():
+    if _backend is None:
+        return set_backend(os.environ.get(BACKEND_VARIABLE, "auto"))
+    return _backend
@@ -0,0 +1,249 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from .backend import BACKENDS, set_backend
+from .curve import *
+from .export import write_binary
+from .surface import NurbSurface
+
+TOLERANCE = 1e-9
+REPEATS = 20
+FRAMES = 1000
+
+
+def random_curve(kind, n, rng):
+    curve = kind()
+    curve.points = np.column_stack((rng.uniform(0, 1000, (n, 2)), np.ones(n), rng.integers(1, 5, n)))
+    return curve
+
+
+def best_time(function, repeats=REPEATS):
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes=(4, 6, 12, 24), samples=(100, 1000, 10000), seed=0):
+    '''
+    Times create_curve on every backend against the recursive reference (nurbs/deboor,
+    bernstein) and checks the backends agree with it within TOLERANCE
+    '''
+    rng = np.random.default_rng(seed)
+    print(f"{'curve':>8} {'n':>4} {'samples':>8} {'backend':>8} {'time (ms)':>10} {'speedup':>9} {'max error':>10}")
+    failures = 0
+    for kind in (Nurb, Bezier):
+        for n in sizes:
+            curve = random_curve(kind, n, rng)
+            for num_points in samples:
+                reference = curve.reference_curve(num_points)
+                reference_time = best_time(lambda: curve.reference_curve(num_points), repeats=1)
+                print(f"{kind.__name__:>8} {n:>4} {num_points:>8} {'python':>8} {reference_time * 1e3:>10.3f} {1:>9.1f} {0:>10.1e}")
+                for name in BACKENDS:
+                    set_backend(name)
+                    points = curve.create_curve(num_points)  # fills the basis caches, compiles numba
+                    error = np.max(np.abs(points - reference))
+                    failures += error > TOLERANCE * max(1, np.max(np.abs(reference)))
+                    elapsed = best_time(lambda: curve.create_curve(num_points))
+                    print(f"{'':>8} {'':>4} {'':>8} {name:>8} {elapsed * 1e3:>10.3f} {reference_time / elapsed:>9.1f} {error:>10.1e}")
+    set_backend()
+    return failures
+
+
+def allocations(n=6, frames=FRAMES, seed=0):
+    '''
+    Drags one control point for a number of frames, redrawing into the same buffer one
+    curve with create_curve and a scene of both curve types with create_curves, and checks
+    with tracemalloc that nothing sample sized is allocated (peak) or kept (net)
+    '''
+    rng = np.random.default_rng(seed)
+    num_points = 100 * n
+    limit = num_points * 2 * 8
+    print(f"{'curve':>8} {'backend':>8} {'net (B)':>8} {'peak (B)':>9} {'buffer (B)':>11}")
+    failures = 0
+    nurb, bezier = random_curve(Nurb, n, rng), random_curve(Bezier, n, rng)
+    scene = [random_curve((Nurb, Bezier)[i % 2], n, rng) for i in range(4)]
+    counts = [num_points] * len(scene)
+    buffer = np.empty((num_points, 2))
+    scene_buffer = np.empty((sum(counts), 2))
+    draws = [("Nurb", nurb, lambda: nurb.create_curve(num_points, out=buffer)),
+             ("Bezier", bezier, lambda: bezier.create_curve(num_points, out=buffer)),
+             ("scene", scene[0], lambda: create_curves(scene, counts, out=scene_buffer))]
+    for label, curve, draw in draws:
+        path = rng.uniform(0, 1000, (frames, 2)).tolist()
+        for name in BACKENDS:
+            set_backend(name)
+            tracemalloc.start()
+            for position in path[:10]:  # warm up numpy's and numba's own caches
+                curve.points[n // 2, :2] = position
+                draw()
+            baseline, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            for position in path:
+                curve.points[n // 2, :2] = position
+                draw()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            net, peak = current - baseline, peak - baseline
+            failures += net >= frames or peak >= limit
+            print(f"{label:>8} {name:>8} {net:>8} {peak:>9} {limit:>11}")
+    set_backend()
+    return failures
+
+
+def degrees(num_curves=12, n=8, seed=0):
+    '''
+    Draws a scene of all cubic curves, one mixing degrees 1 to 5, and one switching every
+    curve's degree every frame: once the caches hold each (order, n, num_points) the three cost the same
+    '''
+    rng = np.random.default_rng(seed)
+    num_points = 100 * n
+    curves = [random_curve(Nurb, n, rng) for _ in range(num_curves)]
+    buffers = [np.empty((num_points, 2)) for _ in curves]
+    mixed = [1 + i % 5 for i in range(num_curves)]
+
+    def draw(degrees):
+        for curve, degree, buffer in zip(curves, degrees, buffers):
+            curve.degree = degree
+            curve.create_curve(num_points, out=buffer)
+
+    def switching():
+        draw(mixed)
+        draw(mixed[::-1])
+
+    print(f"{'scene':>10} {'backend':>8} {'frame (ms)':>11}")
+    for name in BACKENDS:
+        set_backend(name)
+        for label, frame in (("cubic", lambda: draw([3] * num_curves)), ("mixed", lambda: draw(mixed)),
+                             ("switching", switching)):
+            frame()
+            elapsed = best_time(frame) / (2 if label == "switching" else 1)
+            print(f"{label:>10} {name:>8} {elapsed * 1e3:>11.3f}")
+    set_backend()
+
+
+def scene(num_curves=(4, 16, 64), n=8, seed=0):
+    '''
+    A scene of NURBS and Bezier curves drawn curve by curve with create_curve and all at
+    once with create_curves, which stacks curves of the same shape into one product
+    '''
+    rng = np.random.default_rng(seed)
+    print(f"{'curves':>7} {'backend':>8} {'loop (ms)':>10} {'batched (ms)':>13} {'speedup':>9} {'max error':>10}")
+    failures = 0
+    for count in num_curves:
+        curves = [random_curve((Nurb, Bezier)[i % 2], n, rng) for i in range(count)]
+        counts = [100 * n] * count
+        buffers = [np.empty((c, 2)) for c in counts]
+        out = np.empty((sum(counts), 2))
+        for name in BACKENDS:
+            set_backend(name)
+
+            def loop():
+                for curve, c, buffer in zip(curves, counts, buffers):
+                    curve.create_curve(c, out=buffer)
+
+            loop()
+            polylines = create_curves(curves, counts, out=out)
+            error = max(np.max(np.abs(polyline - buffer)) for polyline, buffer in zip(polylines, buffers))
+            failures += error > TOLERANCE * 1000
+            loop_time = best_time(loop)
+            batched_time = best_time(lambda: create_curves(curves, counts, out=out))
+            print(f"{count:>7} {name:>8} {loop_time * 1e3:>10.3f} {batched_time * 1e3:>13.3f} {loop_time / batched_time:>9.1f} {error:>10.1e}")
+    set_backend()
+    return failures
+
+
+def streaming(sizes=(10 ** 5, 10 ** 6, 10 ** 7), chunk_size=CHUNK_SIZE, seed=0):
+    '''
+    Writes ever more samples of one curve to a memory mapped file with write_binary, checks
+    the file against evaluate and that the traced peak stays at a few chunks
+    '''
+    rng = np.random.default_rng(seed)
+    curve = random_curve(Nurb, 12, rng)
+    limit = 8 * chunk_size * 2 * 8
+    print(f"{'samples':>9} {'time (ms)':>10} {'peak (B)':>10} {'limit (B)':>10} {'max error':>10}")
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "samples.bin")
+        for num_points in sizes:
+            tracemalloc.start()
+            start = time.perf_counter()
+            write_binary(curve, path, num_points, chunk_size)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            samples = np.memmap(path, dtype=np.float64, mode="r", shape=(num_points, 2))
+            error = max(np.max(np.abs(samples[i:i + 1000] - curve.evaluate(np.arange(i, i + 1000) / (num_points - 1))))
+                        for i in (0, num_points // 2, num_points - 1000))
+            del samples
+            failures += peak >= limit or error > TOLERANCE * 1000
+            print(f"{num_points:>9} {elapsed * 1e3:>10.1f} {peak:>10} {limit:>10} {error:>10.1e}")
+    return failures
+
+
+def exact_chunks(curve, num_points, chunk_size):
+    # what chunks would do without stepping, every sample through extraction and de Casteljau
+    step = 1 / max(num_points - 1, 1)
+    for start in range(0, num_points, chunk_size):
+        yield curve.evaluate(np.minimum(np.arange(start, min(start + chunk_size, num_points)) * step, 1.0))
+
+
+def stepping(degrees=(1, 2, 3, 5, 8), num_points=10 ** 6, chunk_size=CHUNK_SIZE, seed=0):
+    '''
+    Times chunks, forward differenced on every backend, against evaluating the same chunks
+    exactly, for Nurbs of rising degree, and checks the samples and drift stay within TOLERANCE
+    '''
+    rng = np.random.default_rng(seed)
+    print(f"{'degree':>6} {'backend':>8} {'exact (ms)':>11} {'chunks (ms)':>12} {'speedup':>9} {'max error':>10} {'drift':>8}")
+    failures = 0
+    for degree in degrees:
+        curve = random_curve(Nurb, 12, rng)
+        curve.degree = degree
+        exact = np.concatenate(list(exact_chunks(curve, num_points, chunk_size)))
+        for name in BACKENDS:
+            set_backend(name)
+            points = np.concatenate(list(curve.chunks(num_points, chunk_size)))  # compiles numba
+            error = np.max(np.abs(points - exact))
+            failures += error > TOLERANCE * 1000 or curve.drift > DRIFT_TOLERANCE
+            exact_time = best_time(lambda: sum(len(chunk) for chunk in exact_chunks(curve, num_points, chunk_size)), repeats=3)
+            chunks_time = best_time(lambda: sum(len(chunk) for chunk in curve.chunks(num_points, chunk_size)), repeats=3)
+            print(f"{degree:>6} {name:>8} {exact_time * 1e3:>11.1f} {chunks_time * 1e3:>12.1f} {exact_time / chunks_time:>9.1f} {error:>10.1e} {curve.drift:>8.1e}")
+    set_backend()
+    return failures
+
+
+def surfaces(sizes=(100, 1000, 3000), grid=(8, 8), seed=0):
+    # dense tessellation of one surface, two matrix products however many samples
+    rng = np.random.default_rng(seed)
+    points = np.concatenate((rng.uniform(0, 1000, grid + (3,)), rng.uniform(1, 5, grid + (1,))), axis=2)
+    surface = NurbSurface(points)
+    print(f"{'samples':>11} {'time (ms)':>10}")
+    for num_points in sizes:
+        out = np.empty((num_points, num_points, 3))
+        surface.create_surface(num_points, num_points, out=out)  # fills the basis caches
+        elapsed = best_time(lambda: surface.create_surface(num_points, num_points, out=out), repeats=3)
+        print(f"{num_points:>5}x{num_points:<5} {elapsed * 1e3:>10.3f}")
+
+
+if __name__ == "__main__":
+    failures = run()
+    print()
+    failures += allocations()
+    print()
+    failures += scene()
+    print()
+    failures += streaming()
+    print()
+    failures += stepping()
+    print()
+    degrees()
+    print()
+    surfaces()
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,580 @@
+import numpy as np
+from scipy.linalg import solveh_banded
+from scipy.special import comb
+
+from .backend import get_backend
+
+K = 4
+BUCKETS_PER_SPAN = 16
+DENSITY_DEGREE = 1      # sample density fitted inside a bucket that straddles a knot
+SPLIT_MARGIN = 1e-9     # knots closer than this to a bucket edge (in bucket widths) are on the edge
+ANCHOR_STEPS = 64       # forward difference steps between exact evaluations
+DRIFT_TOLERANCE = 1e-7  # largest accepted drift of a forward differenced sample, in pixels
+CHUNK_SIZE = 65536      # samples per chunk of Curve.chunks
+
+# (order, n) -> normalized knot vector, read only
+knot_cache = {}
+# (order, n, num_points) -> span indices and basis values of the uniform sample grid,
+# the knot vector only depends on order and n so curves of the same shape share them
+basis_cache = {}
+# (order, n, num_points) -> the same basis as a dense (num_points, n) matrix
+basis_matrix_cache = {}
+# (n, num_points) -> Bernstein matrix
+bernstein_cache = {}
+# (curve type, order, n, num_points, curves) -> stacked control points and scratch of a create_curves group
+stack_cache = {}
+# (degree, knot vector bytes) -> span breaks, first control point and extraction operator of every span
+extraction_cache = {}
+
+
+def insert_knot(knots, control, degree, u):
+    '''
+    Knot insertion (Boehm, 1980), on homogeneous control points:
+    Q_i = (1 - a_i) P_i-1 + a_i P_i,  a_i = (u - t_i) / (t_i+p - t_i),  k-p+1 <= i <= k
+    '''
+    span = np.searchsorted(knots, u, side="right") - 1
+    new_control = np.empty((len(control) + 1, control.shape[1]))
+    new_control[:span - degree + 1] = control[:span - degree + 1]
+    new_control[span + 1:] = control[span:]
+    for i in range(span - degree + 1, span + 1):
+        alpha = (u - knots[i]) / (knots[i + degree] - knots[i])
+        new_control[i] = (1 - alpha) * control[i - 1] + alpha * control[i]
+    return np.insert(knots, span + 1, u), new_control
+
+
+def extraction_operators(knots, degree):
+    '''
+    Bezier extraction (Borden et al., 2011): raising every interior knot to multiplicity p
+    is linear in the control points, so inserting the knots into the identity gives the
+    matrix C with Q = C P. Its block for span e is the (p+1, p+1) operator C_e,
+    Q_e = C_e P_first(e)...P_first(e)+p, which depends only on the knot vector.
+    Returns the breaks (E+1,), first (E,) and operators (E, p+1, p+1).
+    '''
+    key = (degree, knots.tobytes())
+    if key not in extraction_cache:
+        n = len(knots) - degree - 1
+        refined, matrix = knots, np.eye(n)
+        for u in np.unique(knots[degree + 1:-degree - 1]):
+            for _ in range(degree - np.count_nonzero(knots == u)):
+                refined, matrix = insert_knot(refined, matrix, degree, u)
+
+        breaks = np.unique(knots)
+        first = np.searchsorted(knots, breaks[:-1], side="right") - 1 - degree
+        operators = np.stack([matrix[e * degree:e * degree + degree + 1, f:f + degree + 1]
+                              for e, f in enumerate(first)])
+        extraction_cache[key] = (breaks, first, operators)
+    return extraction_cache[key]
+
+
+class Curve():
+    def __init__(self):
+        self.points = np.empty((0, 4))
+        self.degree = K-1
+        self.scratch = (None, None)
+        self.drift = 0.0
+
+    def workspace(self, num_points):
+        # per curve arrays reused by every create_curve(num_points, out=...) of the same size
+        key = (len(self.points), num_points)
+        if self.scratch[0] != key:
+            self.scratch = (key, (np.empty((3, len(self.points))), np.empty((3, num_points)), np.empty((3, num_points))))
+        return self.scratch[1]
+
+    def evaluate(self, u):
+        # any u through the per-span rational Bezier polygons, one kernel for both curve types
+        breaks, control = self.bezier_segments()
+        u = np.asarray(u, dtype=float)
+        segment = np.clip(np.searchsorted(breaks, u, side="right") - 1, 0, len(breaks) - 2)
+        t = (u - breaks[segment]) / (breaks[segment + 1] - breaks[segment])
+        return get_backend().rational_bezier(control, segment, t)
+
+    def chunks(self, num_points, chunk_size=CHUNK_SIZE, anchor=ANCHOR_STEPS, tolerance=DRIFT_TOLERANCE):
+        '''
+        The create_curve samples in order, at most chunk_size at a time, for outputs too
+        large to hold: memory stays at one chunk whatever num_points is. Each chunk is a
+        new (<= chunk_size, 2) array, stepped through the Bezier pieces extracted once up front
+        by forward differencing (Foley, 1990): uniform steps of a degree p polynomial have a
+        constant p-th difference, so after a table of p+1 exact values every sample costs p additions
+        P_k+1 = P_k + dP_k, dP_k+1 = dP_k + d2P_k, ...
+        The table is rebuilt from exact values every anchor steps. The last sample of each
+        run is checked against an exact evaluation and the run redone with half the steps
+        while the drift is above tolerance; the largest accepted drift goes to self.drift.
+        Both backends step, numba up to degree MAX_FORWARD_DEGREE and numpy, a cumulative sum
+        per difference level, up to MAX_ARRAY_FORWARD_DEGREE; higher pieces are evaluated exactly.
+        '''
+        self.drift = 0.0
+        if len(self.points) == 0:
+            return
+        breaks, control = self.bezier_segments()
+        step = 1 / max(num_points - 1, 1)
+        # first sample of every piece, k * step >= break, a sample on a break starts the next piece
+        starts = np.ceil(breaks / step).astype(np.int64)
+        starts -= (starts - 1) * step >= breaks
+        starts += starts * step < breaks
+        starts[0], starts[-1] = 0, num_points
+        backend = get_backend()
+        for start in range(0, num_points, chunk_size):
+            out = np.empty((min(chunk_size, num_points - start), 2))
+            drift = backend.forward_differences(control, breaks, starts, step, start, anchor, tolerance, out)
+            self.drift = max(self.drift, drift)
+            if start + len(out) == num_points > 1:
+                out[-1] = control[-1, -1, :2] / control[-1, -1, 2]
+            yield out
+
+class Nurb(Curve):
+    def __init__(self, degree=K-1):
+        super().__init__()
+        # per curve and free to change at runtime, every cache below is keyed by order
+        self.degree = degree
+
+    def order(self):
+        # curves with fewer than K points drop to the highest degree they can support
+        return max(1, min(self.degree + 1, len(self.points)))
+
+    def knot_vector(self):
+        '''
+        For an open nonuniform curve that interpolated the end points, the t_j (knot value) are calculated using K: (Mortensen, 2006)
+        t_j = 0 if j < K
+        t_j = j - K + 1 if K <= j <= n
+        t_j = n - K + 2 if j > n
+        '''
+
+        n = len(self.points) - 1
+        order = self.order()
+        knot_vector = np.zeros(order)
+        middle = np.arange(order, n + 1) - order + 1
+        knot_vector = np.concatenate((knot_vector, middle, np.full(order, n - order + 2)))
+        
+        return knot_vector
+
+    def normalized_knot(self, knots):
+        # knot_vector [0,1]
+        min_val = np.min(knots)
+        max_val = np.max(knots)
+        
+        normalized_knots = (knots - min_val) / (max_val - min_val)
+        return normalized_knots
+
+    def knots(self):
+        # normalized knot vector, shared by every curve of the same order and size
+        key = (self.order(), len(self.points))
+        if key not in knot_cache:
+            knots = self.normalized_knot(self.knot_vector())
+            knots.flags.writeable = False
+            knot_cache[key] = knots
+        return knot_cache[key]
+
+    def deboor(self, param_u, point_index, degree, knots):
+        '''
+        Cox-deBoor (Foley, 1990):
+        Bk,0 (u) = 1 if u_k <= u <= u_k+1
+                 = 0 otherwise
+        Bk,d(u) = (((u - u_k) / (u_(k+d) - u_k)) * Bk,d-1(u)) + (((u_(k+d+1) - u) / (u_(k+d+1) - u_(k+1))) * Bk+1,d-1(u))
+        '''
+        
+        if degree == 0:
+            if param_u >= knots[point_index] and param_u < knots[point_index + 1]:
+                return 1
+            # the last non-empty span is closed so the curve reaches its end point
+            elif param_u == knots[-1] and knots[point_index] < knots[point_index + 1] == knots[-1]:
+                return 1
+            else:
+                return 0
+            
+        # treating */0 = 0
+        if (knots[point_index + degree] - knots[point_index]) != 0:
+            first_deboor = self.deboor(param_u, point_index, degree - 1, knots)
+            first = ((param_u - knots[point_index]) / (knots[point_index + degree] - knots[point_index])) * first_deboor
+        else:
+            first = 0
+        if (knots[point_index + degree + 1] - knots[point_index + 1]) != 0:
+            second_deboor = self.deboor(param_u, point_index + 1, degree - 1, knots)
+            second = ((knots[point_index + degree + 1] - param_u) / (knots[point_index + degree + 1] - knots[point_index + 1])) * second_deboor
+        else:
+            second = 0
+        
+        return first + second
+
+    def find_span(self, u, knots):
+        return get_backend().find_span(knots, self.order() - 1, u)
+
+    def basis(self, span, u, knots):
+        return get_backend().basis(knots, self.order() - 1, span, u)
+
+    def homogeneous(self):
+        # (x, y, z, w) -> (w*x, w*y, w)
+        weights = self.points[:, -1:]
+        return np.hstack((self.points[:, :-2] * weights, weights))
+
+    def bezier_segments(self):
+        '''
+        The curve as E rational Bezier pieces: breaks (E+1,) in u and the homogeneous
+        polygons (E, p+1, 3), Q_e = C_e P_e with the cached operators of the knot vector
+        '''
+        degree = self.order() - 1
+        breaks, first, operators = extraction_operators(self.knots(), degree)
+        control = self.homogeneous()[first[:, None] + np.arange(degree + 1)]
+        return breaks, np.matmul(operators, control)
+    
+    def nurbs(self, param_u, knots):
+        '''
+        NURBS (Mortensen, 2006):
+        p(u) = (sum i=0~n (h_i * p_i * Ni,k(u))) / (sum i=0~n (h_i * Ni,k(u)))
+
+        h = weight
+        p = control point
+        n = num control points
+        Ni,k = nonuniform B-spline basis function (cox deboor)
+        '''
+        first = 0
+        second = 0
+        degree = self.order() - 1
+
+        for point_index in range(len(self.points)):
+            deboor = self.deboor(param_u, point_index, degree, knots)
+            first = first + self.points[point_index,-1]*self.points[point_index,:-2]*deboor
+            second = second + self.points[point_index,-1]*deboor
+
+        return first / second
+    
+    def sample_basis(self, num_points):
+        key = (self.order(), len(self.points), num_points)
+        if key not in basis_cache:
+            knots = self.knots()
+            u = np.linspace(0, 1, num_points)
+            span = self.find_span(u, knots)
+            indices = span - (self.order() - 1) + np.arange(self.order())[:, None]
+            basis_cache[key] = (np.ascontiguousarray(indices), np.ascontiguousarray(self.basis(span, u, knots).T))
+        return basis_cache[key]
+
+    def basis_matrix(self, num_points):
+        key = (self.order(), len(self.points), num_points)
+        if key not in basis_matrix_cache:
+            indices, values = self.sample_basis(num_points)
+            matrix = np.zeros((num_points, len(self.points)))
+            matrix[np.arange(num_points), indices] = values
+            matrix.flags.writeable = False
+            basis_matrix_cache[key] = matrix
+        return basis_matrix_cache[key]
+
+    def create_curve(self, num_points, out=None):
+        '''
+        num_points samples of the curve at uniform u, into out (num_points, 2) when given.
+        Basis values come from basis_cache and the homogeneous control points go to the
+        curve's workspace, so redrawing an edited curve allocates nothing
+        '''
+        n = len(self.points)
+        if n == 0:
+            return np.empty((0,2))
+        if out is None:
+            out = np.empty((num_points, 2))
+        indices, values = self.sample_basis(num_points)
+        control, weighted, gathered = self.workspace(num_points)
+        np.multiply(self.points[:, 0], self.points[:, -1], out=control[0])
+        np.multiply(self.points[:, 1], self.points[:, -1], out=control[1])
+        control[2] = self.points[:, -1]
+
+        return get_backend().evaluate_basis(indices, values, control, out, (weighted, gathered))
+
+    def create_stack(self, num_points, points, out, workspace):
+        '''
+        create_curve of a (curves, n, 4) stack of control points of this curve's order and size,
+        into out (curves, num_points, 2), with workspace (curves, n, 3) and (curves, num_points, 3)
+        '''
+        indices, values = self.sample_basis(num_points)
+        return get_backend().evaluate_batch(indices, values, self.basis_matrix(num_points), points, out, workspace)
+
+    def reference_curve(self, num_points):
+        # point by point through the recursive nurbs/deboor, to check the backends against
+        if len(self.points) == 0:
+            return np.empty((0, 2))
+        knots = self.normalized_knot(self.knot_vector())
+        return np.array([self.nurbs(t, knots) for t in np.linspace(0, 1, num_points)]).reshape(-1, 2)
+
+    @classmethod
+    def fit(cls, points, count, degree=K-1, chunk_size=4096):
+        '''
+        Least squares NURBS through an ordered point cloud or stroke, either an (m, 2) array
+        or an iterable of such chunks (see NurbFit)
+        '''
+        fit = NurbFit(count, degree)
+        chunks = points
+        if isinstance(points, np.ndarray):
+            chunks = (points[start:start + chunk_size] for start in range(0, len(points), chunk_size))
+        for chunk in chunks:
+            fit.add(chunk)
+        return fit.curve()
+
+
+class NurbFit():
+    '''
+    Streaming least squares fit (Piegl & Tiller, 1997, 9.4.1) with chord length parameters
+    u_k = s_k / L, s_k the length of the polyline up to sample k.
+
+    L is only known at the end, so samples are binned by s into buckets holding the power
+    moments sum x^d and sum x^d Q (x the position inside the bucket). When the stroke outgrows
+    the buckets, neighbouring pairs merge exactly (x' = (x + offset) / 2) and the width doubles,
+    so memory stays at BUCKETS_PER_SPAN buckets per knot span whatever the number of samples.
+    Inside a bucket each basis function is one polynomial, which turns the normal equations
+    into a few small products with those moments. A bucket straddling a knot is split there
+    at solve time (see split), the only approximate step: the sample distribution inside
+    such a bucket is only known through its moments. Against a dense least squares on the
+    same parameters (2e5 samples, 8 control points, smooth and noisy strokes) the control
+    points differ by up to about 2e-3 px at degree 1, 1e-5 px at degree 2 and 3e-6 px at
+    degree 3; without the split it was 0.14, 9e-4 and 7e-5 px. A stroke added as a single
+    chunk puts the bucket edges on the knots and fits exactly.
+    '''
+
+    def __init__(self, count, degree=K-1):
+        if count < degree + 1:
+            raise ValueError("A degree " + str(degree) + " NURBS needs at least " + str(degree + 1) + " control points.")
+        self.template = Nurb(degree)
+        self.template.points = np.zeros((count, 4))
+        self.knots = self.template.knots()
+
+        self.max_buckets = 2 * BUCKETS_PER_SPAN * (count - degree)
+        self.moments = np.zeros((self.max_buckets, 2 * degree + 1))
+        self.sums = np.zeros((self.max_buckets, degree + 1, 2))
+        self.width = None
+        self.length = 0.0
+        self.first = None
+        self.last = None
+
+    def merge(self):
+        # buckets 2k, 2k+1 -> k: sum ((x + o) / 2)^d = 2^-d sum_e comb(d, e) o^(d-e) sum x^e
+        powers = np.arange(self.moments.shape[1])
+        shift = np.tril(comb(powers[:, None], powers[None, :])) / 2.0 ** powers[:, None]
+        scale = np.diag(0.5 ** powers)
+        half = self.max_buckets // 2
+        sums_shift, sums_scale = shift[:self.sums.shape[1], :self.sums.shape[1]], scale[:self.sums.shape[1], :self.sums.shape[1]]
+
+        self.moments[:half] = self.moments[0::2] @ scale.T + self.moments[1::2] @ shift.T
+        self.sums[:half] = np.einsum("de,bec->bdc", sums_scale, self.sums[0::2]) + np.einsum("de,bec->bdc", sums_shift, self.sums[1::2])
+        self.moments[half:] = 0
+        self.sums[half:] = 0
+        self.width *= 2
+
+    def add(self, chunk):
+        chunk = np.atleast_2d(np.asarray(chunk, dtype=float))[:, :2]
+        if len(chunk) == 0:
+            return
+        if self.first is None:
+            self.first = chunk[0].copy()
+            self.last = chunk[0].copy()
+
+        steps = np.hypot(*np.diff(np.vstack((self.last, chunk)), axis=0).T)
+        length = self.length + np.cumsum(steps)
+        self.length = length[-1]
+        self.last = chunk[-1].copy()
+
+        if self.width is None:
+            if self.length == 0:
+                self.moments[0, 0] += len(chunk)
+                self.sums[0, 0] += chunk.sum(axis=0)
+                return
+            self.width = 2 * self.length / self.max_buckets
+        while self.length >= self.width * self.max_buckets:
+            self.merge()
+
+        position = length / self.width
+        index = position.astype(int)
+        x = position - index
+        powers = x[:, None] ** np.arange(self.moments.shape[1])
+        starts = np.flatnonzero(np.diff(index, prepend=-1))
+        self.moments[index[starts]] += np.add.reduceat(powers, starts, axis=0)
+        self.sums[index[starts]] += np.add.reduceat(powers[:, :self.sums.shape[1], None] * chunk[:, None, :], starts, axis=0)
+
+    def split(self, moments, sums, x):
+        '''
+        The share of straddling buckets' moments below x, their knot in bucket coordinates.
+        The bucket's samples are taken as a density rho(x) = sum_k a_k x^k, k <= DENSITY_DEGREE,
+        with the bucket's own low moments int_0^1 rho x^e = sum x^e (likewise for sum x^d Q):
+        sum_(x_i < x) x_i^e ~ int_0^x rho x^e = sum_k a_k x^(e+k+1) / (e+k+1)
+        Only the smaller side is integrated, the larger one gets the rest of the moments, so
+        the two parts add up exactly and the error stays on the side with fewer samples.
+        '''
+        upper = x > 0.5
+        parts = []
+        for values in (moments[..., None], sums):
+            degree = min(DENSITY_DEGREE, values.shape[1] - 1)
+            powers = np.arange(degree + 1)
+            hilbert = 1 / (np.add.outer(powers, powers) + 1)
+            density = np.linalg.solve(hilbert, values[:, :degree + 1])
+            exponents = np.add.outer(np.arange(values.shape[1]), powers) + 1
+            below = np.einsum("bkc,bek->bec", density, x[:, None, None] ** exponents / exponents)
+            above = np.einsum("bkc,bek->bec", density, (1 - x[:, None, None] ** exponents) / exponents)
+            parts.append(np.where(upper[:, None, None], values - above, below))
+        return parts[0][..., 0], parts[1]
+
+    def curve(self, clamp_ends=True):
+        '''
+        Solves the banded normal equations (N^T N) P = N^T Q, bandwidth p, optionally with the
+        first and last control points fixed on the first and last samples
+        '''
+        if not self.length:
+            raise ValueError("Cannot fit a NURBS to a stroke with no length.")
+        template = self.template
+        count = len(template.points)
+        degree = template.order() - 1
+
+        used = np.flatnonzero(self.moments[:, 0])
+        nodes = np.linspace(0, 1, degree + 1)
+        scale = self.width / self.length
+        moments, sums = self.moments[used], self.sums[used]
+        middles = (used + 0.5) * scale
+
+        # a bucket straddling a knot becomes two pieces, each inside one span
+        interior = np.unique(self.knots[degree + 1:-degree - 1])
+        if len(interior):
+            knot = interior[np.minimum(np.searchsorted(interior, used * scale, side="right"), len(interior) - 1)]
+            inside = knot / scale - used
+            straddles = (inside > SPLIT_MARGIN) & (inside < 1 - SPLIT_MARGIN)
+            below, below_sums = self.split(moments[straddles], sums[straddles], inside[straddles])
+            split, knot = used[straddles], knot[straddles]
+            moments, sums = moments.copy(), sums.copy()
+            moments[straddles] -= below
+            sums[straddles] -= below_sums
+            middles[straddles] = 0.5 * (knot + (split + 1) * scale)
+            used = np.concatenate((used, split))
+            moments = np.concatenate((moments, below))
+            sums = np.concatenate((sums, below_sums))
+            middles = np.concatenate((middles, 0.5 * (knot + split * scale)))
+
+        spans = template.find_span(np.minimum(middles, 1), self.knots)
+        values = template.basis(spans[:, None], (used[:, None] + nodes) * scale, self.knots)
+        # polynomial coefficients c_d,i of each basis function in the bucket coordinate x
+        coefficients = np.linalg.solve(np.vander(nodes, degree + 1, increasing=True), values)
+        hankel = moments[:, np.add.outer(np.arange(degree + 1), np.arange(degree + 1))]
+        blocks = np.einsum("bdi,bde,bej->bij", coefficients, hankel, coefficients)
+        right_sides = np.einsum("bdi,bdc->bic", coefficients, sums)
+
+        # upper banded storage, banded[p + i - j, j] = A[i, j]
+        banded = np.zeros((degree + 1, count))
+        rhs = np.zeros((count, 2))
+        first = spans - degree
+        rows, columns = np.triu_indices(degree + 1)
+        np.add.at(banded, (degree + rows - columns, first[:, None] + columns), blocks[:, rows, columns])
+        np.add.at(rhs, first[:, None] + np.arange(degree + 1), right_sides)
+
+        control = np.empty((count, 2))
+        if clamp_ends:
+            control[0], control[-1] = self.first, self.last
+            offsets = np.arange(1, degree + 1)
+            inner = offsets[offsets < count - 1]
+            rhs[inner] -= banded[degree - inner, inner, None] * control[0]
+            inner = count - 1 - offsets[count - 1 - offsets > 0]
+            rhs[inner] -= banded[degree + inner - (count - 1), count - 1, None] * control[-1]
+            banded = banded[:, 1:-1].copy()
+            for j in range(1, min(degree, count - 2) + 1):
+                banded[degree - j, j - 1] = 0
+            rhs = rhs[1:-1]
+            target = control[1:-1]
+        else:
+            target = control
+        if len(target):
+            try:
+                target[:] = solveh_banded(banded, rhs)
+            except np.linalg.LinAlgError:
+                raise ValueError("Not enough samples to fit " + str(count) + " control points.")
+
+        curve = Nurb(degree)
+        curve.points = np.column_stack((control, np.ones(count), np.ones(count)))
+        return curve
+    
+class Bezier(Curve):
+
+    def bernstein(self, u, n, v):
+        '''
+        Bernstein basis polynomials (wiki):
+        
+        n+1 of degree n
+
+        b_v,n(u) := comb(n v) u^v (1 - u)^(n - v), v = 0,...,n
+        '''
+        c = comb(n, v, exact=False)
+        a = u ** v
+        b = (1 - u) ** (n - v)
+        return c * a * b
+
+    def homogeneous(self):
+        # Bezier curves are drawn without weights
+        return np.hstack((self.points[:, :-2], np.ones((len(self.points), 1))))
+
+    def bezier_segments(self):
+        # a single piece, same layout as Nurb.bezier_segments
+        return np.array([0.0, 1.0]), self.homogeneous()[None]
+    
+    def basis_matrix(self, num_points):
+        n = len(self.points)
+        key = (n, num_points)
+        if key not in bernstein_cache:
+            bernstein_cache[key] = self.bernstein(np.linspace(0, 1, num_points)[:, None], n - 1, np.arange(n))
+        return bernstein_cache[key]
+
+    def create_stack(self, num_points, points, out, workspace):
+        # create_curve of a (curves, n, 4) stack of control points the size of this curve's, into out (curves, num_points, 2)
+        return get_backend().evaluate_bernstein_batch(self.basis_matrix(num_points), points, out)
+
+    def create_curve(self, num_points, out=None):
+        # num_points samples at uniform u, into out (num_points, 2) when given
+        n = len(self.points)
+        if n == 0:
+            return np.empty((0, 2))
+        if out is None:
+            out = np.empty((num_points, 2))
+        return get_backend().evaluate_bernstein(self.basis_matrix(num_points), self.points[:, :-2], out)
+
+    def reference_curve(self, num_points):
+        '''
+        De Casteljau's algorithm (wiki):
+
+        Curve B of degree n, control poins B0,...,Bn
+        B(t) = sum i=0...n Bi*b_i,n(t)
+        '''
+        n = len(self.points)
+        curve_points = []
+        for t in np.linspace(0, 1, num_points):
+            points = self.points[:, :-1]
+            point = np.array((0.0, 0.0))
+            for i in range(len(points)):
+                b = self.bernstein(t, n - 1, i)
+                point += points[i, :-1] * b
+            curve_points.append(point)
+        
+        return np.array(curve_points).reshape(-1, 2)
+
+
+def create_curves(curves, counts, out=None):
+    '''
+    create_curve for a whole scene, counts[i] samples of curves[i]. Curves of the same type,
+    order, n and count share their cached basis, so they are stacked into one
+    (curves, n, 4) tensor and evaluated together, each group written to one contiguous
+    run of out (sum(counts), 2). Returns the polyline of every curve, as views into out.
+    The stacks and the product scratch of every group are kept in stack_cache, so
+    redrawing the same scene into the same out allocates nothing sample sized.
+    '''
+    if out is None:
+        out = np.empty((sum(counts), 2))
+    groups = {}
+    for index, (curve, count) in enumerate(zip(curves, counts)):
+        if len(curve.points) and count:
+            order = curve.order() if isinstance(curve, Nurb) else len(curve.points)
+            groups.setdefault((type(curve), order, len(curve.points), count), []).append(index)
+
+    polylines = [out[:0]] * len(curves)
+    start = 0
+    for key, members in groups.items():
+        _, _, n, count = key
+        key += (len(members),)
+        if key not in stack_cache:
+            stack_cache[key] = (np.empty((len(members), n, 4)),
+                                (np.empty((len(members), n, 3)), np.empty((len(members), count, 3))))
+        stack, workspace = stack_cache[key]
+        for g, i in enumerate(members):
+            stack[g] = curves[i].points
+        block = out[start:start + len(members) * count].reshape(len(members), count, 2)
+        curves[members[0]].create_stack(count, stack, block, workspace)
+        for i, polyline in zip(members, block):
+            polylines[i] = polyline
+        start += len(members) * count
+    return polylines
@@ -0,0 +1,65 @@
+import os
+from contextlib import nullcontext
+
+import numpy as np
+
+from .curve import CHUNK_SIZE
+
+FEED_RATE = 1000
+
+
+def opened(target, mode):
+    # paths are opened and closed here, file objects are written to as they are
+    if isinstance(target, (str, os.PathLike)):
+        return open(target, mode)
+    return nullcontext(target)
+
+
+def write_binary(curve, target, num_points, chunk_size=CHUNK_SIZE, dtype=np.float64):
+    '''
+    num_points samples of the curve as a raw (num_points, 2) array of dtype, x y per sample.
+    A path is written through a memory map of that size, a binary stream chunk by chunk;
+    either way only one chunk of samples is in memory at a time
+    '''
+    if not isinstance(target, (str, os.PathLike)):
+        for chunk in curve.chunks(num_points, chunk_size):
+            target.write(chunk.astype(dtype).tobytes())
+        return target
+
+    samples = np.memmap(target, dtype=dtype, mode="w+", shape=(num_points, 2))
+    start = 0
+    for chunk in curve.chunks(num_points, chunk_size):
+        samples[start:start + len(chunk)] = chunk
+        start += len(chunk)
+    samples.flush()
+    del samples
+    return target
+
+
+def write_gcode(curve, target, num_points, chunk_size=CHUNK_SIZE, feed=FEED_RATE, scale=1.0):
+    '''
+    The curve as a G-code polyline: rapid move to the first sample, then linear moves
+    through the rest at feed, coordinates multiplied by scale. Written chunk by chunk
+    '''
+    with opened(target, "w") as file:
+        file.write(f"; {num_points} samples\nG21\nG90\n")
+        first = True
+        for chunk in curve.chunks(num_points, chunk_size):
+            chunk = chunk * scale
+            if first:
+                file.write(f"G0 X{chunk[0, 0]:.4f} Y{chunk[0, 1]:.4f}\nG1 F{feed}\n")
+                chunk = chunk[1:]
+                first = False
+            np.savetxt(file, chunk, fmt="G1 X%.4f Y%.4f")
+    return target
+
+
+def write_obj(surface, target, num_u, num_v):
+    # the surface's triangle mesh (NurbSurface.mesh) as a Wavefront OBJ file, no window needed
+    vertices, faces = surface.mesh(num_u, num_v)
+    with opened(target, "w") as file:
+        file.write(f"# {len(vertices)} vertices, {len(faces)} faces\n")
+        np.savetxt(file, vertices, fmt="v %.6f %.6f %.6f")
+        np.savetxt(file, faces + 1, fmt="f %d %d %d")
+    return target
+
@@ -0,0 +1,279 @@
+import weakref
+
+import numpy as np
+
+from .curve import *
+
+FLATNESS = 0.5      # control polygon deviation (px) below which a box is a leaf
+MAX_DEPTH = 24
+PARAM_TOLERANCE = 1e-9
+NEWTON_STEPS = 16
+MISS = ()           # polish converged outside the leaf pair, the root belongs to a neighbour
+
+# curve -> (state key, hierarchy), rebuilt only when the curve is edited
+_hierarchies = weakref.WeakKeyDictionary()
+
+
+def curve_segments(curve):
+    breaks, control = curve.bezier_segments()
+    return [(breaks[i], breaks[i + 1], control[i]) for i in range(len(control))]
+
+
+def de_casteljau(control, t):
+    '''
+    De Casteljau's algorithm (wiki), keeping the last two points of the triangle:
+    point = (1 - t) Q0 + t Q1, derivative = n (Q1 - Q0)
+    also returns both halves of the split polygon
+    '''
+    n = len(control) - 1
+    left = np.empty_like(control)
+    right = np.empty_like(control)
+    level = control.copy()
+    left[0], right[n] = level[0], level[n]
+    for r in range(1, n + 1):
+        if r == n:
+            q0, q1 = level[0].copy(), level[1].copy()
+        level = (1 - t) * level[:-1] + t * level[1:]
+        left[r], right[n - r] = level[0], level[-1]
+    if n == 0:
+        q0 = q1 = control[0]
+    return level[0], n * (q1 - q0), left, right
+
+
+def rational_point(control, t):
+    # evaluates a homogeneous Bezier polygon, returns the point and its derivative
+    h, dh, _, _ = de_casteljau(control, t)
+    point = h[:2] / h[2]
+    return point, (dh[:2] - point * dh[2]) / h[2]
+
+
+class BoxNode():
+    '''
+    One piece of a curve in the bounding box hierarchy. Rational Bezier pieces with
+    positive weights lie in the convex hull of their control points, so the box of
+    the projected polygon bounds the curve.
+    '''
+    __slots__ = ("control", "t0", "t1", "depth", "low", "high", "size", "flat", "_children")
+
+    def __init__(self, control, t0, t1, depth=0):
+        self.control = control
+        self.t0, self.t1 = t0, t1
+        self.depth = depth
+        projected = control[:, :2] / control[:, 2:]
+        self.low = projected.min(axis=0).tolist()
+        self.high = projected.max(axis=0).tolist()
+        self.size = max(self.high[0] - self.low[0], self.high[1] - self.low[1])
+
+        chord = projected[-1] - projected[0]
+        length = np.hypot(*chord)
+        offsets = projected[1:-1] - projected[0]
+        if length == 0:
+            deviation = np.max(np.hypot(offsets[:, 0], offsets[:, 1]), initial=0)
+        else:
+            deviation = np.max(np.abs(offsets[:, 0] * chord[1] - offsets[:, 1] * chord[0]), initial=0) / length
+        self.flat = deviation < FLATNESS or depth >= MAX_DEPTH
+        self._children = None
+
+    def children(self):
+        if self._children is None:
+            _, _, left, right = de_casteljau(self.control, 0.5)
+            middle = 0.5 * (self.t0 + self.t1)
+            self._children = (BoxNode(left, self.t0, middle, self.depth + 1),
+                              BoxNode(right, middle, self.t1, self.depth + 1))
+        return self._children
+
+    def overlaps(self, other, margin=0.0):
+        return (self.low[0] <= other.high[0] + margin and other.low[0] <= self.high[0] + margin
+                and self.low[1] <= other.high[1] + margin and other.low[1] <= self.high[1] + margin)
+
+    def is_monotone(self):
+        # every edge of the control polygon points the same way as the chord: the piece cannot cross itself
+        projected = self.control[:, :2] / self.control[:, 2:]
+        edges = np.diff(projected, axis=0)
+        direction = projected[-1] - projected[0]
+        return bool(np.all(edges @ direction > 0))
+
+
+class CurveHierarchy():
+    def __init__(self, curve):
+        self.roots = [BoxNode(control, t0, t1) for t0, t1, control in curve_segments(curve)]
+        self.low = np.min([root.low for root in self.roots], axis=0)
+        self.high = np.max([root.high for root in self.roots], axis=0)
+        # other hierarchy -> crossings, dropped as soon as either curve is edited
+        self.crossings = weakref.WeakKeyDictionary()
+
+    def monotone_pieces(self):
+        pieces = []
+        stack = list(reversed(self.roots))
+        while stack:
+            node = stack.pop()
+            if node.is_monotone() or node.depth >= MAX_DEPTH:
+                pieces.append(node)
+            else:
+                stack.extend(reversed(node.children()))
+        return pieces
+
+
+def hierarchy(curve):
+    key = (type(curve), curve.order() if isinstance(curve, Nurb) else None, curve.points.tobytes())
+    cached = _hierarchies.get(curve)
+    if cached is None or cached[0] != key:
+        cached = (key, CurveHierarchy(curve))
+        _hierarchies[curve] = cached
+    return cached[1]
+
+
+def chord_guess(node_a, node_b):
+    # intersection of the two chords, as local parameters of each node
+    pa = node_a.control[[0, -1], :2] / node_a.control[[0, -1], 2:]
+    pb = node_b.control[[0, -1], :2] / node_b.control[[0, -1], 2:]
+    da, db = pa[1] - pa[0], pb[1] - pb[0]
+    denominator = da[0] * db[1] - da[1] * db[0]
+    if denominator == 0:
+        return 0.5, 0.5
+    offset = pb[0] - pa[0]
+    s = (offset[0] * db[1] - offset[1] * db[0]) / denominator
+    t = (offset[0] * da[1] - offset[1] * da[0]) / denominator
+    return float(s), float(t)
+
+
+def polish(node_a, node_b, tolerance):
+    '''
+    Newton iteration on F(s, t) = A(s) - B(t) = 0 inside the leaf pair:
+    [A'(s) -B'(t)] [ds dt]^T = -F
+    Returns MISS when the root lies outside both leaves and None when the iteration
+    stalls (tangential contact), so the caller can split further.
+    '''
+    s, t = chord_guess(node_a, node_b)
+    if not (-0.5 <= s <= 1.5 and -0.5 <= t <= 1.5):
+        return MISS
+    s, t = min(max(s, 0.0), 1.0), min(max(t, 0.0), 1.0)
+    for _ in range(NEWTON_STEPS):
+        point_a, tangent_a = rational_point(node_a.control, s)
+        point_b, tangent_b = rational_point(node_b.control, t)
+        rx, ry = point_a - point_b
+        if rx * rx + ry * ry < tolerance * tolerance:
+            if -PARAM_TOLERANCE <= s <= 1 + PARAM_TOLERANCE and -PARAM_TOLERANCE <= t <= 1 + PARAM_TOLERANCE:
+                return min(max(s, 0.0), 1.0), min(max(t, 0.0), 1.0), point_a
+            return MISS
+        ax, ay = tangent_a
+        bx, by = tangent_b
+        determinant = bx * ay - ax * by
+        if abs(determinant) < 1e-12:
+            return None
+        s += (by * rx - bx * ry) / determinant
+        t += (ay * rx - ax * ry) / determinant
+        if not (-0.5 <= s <= 1.5 and -0.5 <= t <= 1.5):
+            return MISS
+    return None
+
+
+def node_pair_intersections(pairs, tolerance):
+    hits = []
+    while pairs:
+        node_a, node_b = pairs.pop()
+        if not node_a.overlaps(node_b, tolerance):
+            continue
+        if node_a.flat and node_b.flat:
+            found = polish(node_a, node_b, tolerance)
+            if found is MISS:
+                continue
+            if found is not None:
+                s, t, point = found
+                hits.append((node_a.t0 + s * (node_a.t1 - node_a.t0), node_b.t0 + t * (node_b.t1 - node_b.t0), point))
+                continue
+            # tangential contact or overlapping pieces: keep splitting down to pixel size
+            if max(node_a.size, node_b.size) < FLATNESS or min(node_a.depth, node_b.depth) >= MAX_DEPTH:
+                s, t = (min(max(value, 0.0), 1.0) for value in chord_guess(node_a, node_b))
+                point_a, _ = rational_point(node_a.control, s)
+                point_b, _ = rational_point(node_b.control, t)
+                if np.hypot(*(point_a - point_b)) < FLATNESS:
+                    hits.append((node_a.t0 + s * (node_a.t1 - node_a.t0), node_b.t0 + t * (node_b.t1 - node_b.t0), 0.5 * (point_a + point_b)))
+                continue
+        if node_b.depth >= MAX_DEPTH or (node_a.depth < MAX_DEPTH and node_a.size >= node_b.size):
+            pairs.extend((child, node_b) for child in node_a.children())
+        else:
+            pairs.extend((node_a, child) for child in node_b.children())
+    return hits
+
+
+def unique_hits(hits, tolerance):
+    unique = []
+    for u, v, point in sorted(hits, key=lambda hit: (hit[0], hit[1])):
+        if not any(np.hypot(*(point - other[2])) < 10 * tolerance for other in unique):
+            unique.append((u, v, point))
+    return unique
+
+
+def intersect(curve_a, curve_b, tolerance=1e-6):
+    '''
+    All points where two curves cross, as (u, v, point) with u, v the [0, 1] parameters
+    on each curve. Box pairs that don't overlap are pruned, the rest are subdivided until
+    both sides are flat and then refined with Newton's method.
+    '''
+    if len(curve_a.points) < 2 or len(curve_b.points) < 2:
+        return []
+    hierarchy_a, hierarchy_b = hierarchy(curve_a), hierarchy(curve_b)
+    cached = hierarchy_a.crossings.get(hierarchy_b)
+    if cached is None or cached[0] != tolerance:
+        pairs = [(a, b) for a in hierarchy_a.roots for b in hierarchy_b.roots]
+        cached = (tolerance, unique_hits(node_pair_intersections(pairs, tolerance), tolerance))
+        hierarchy_a.crossings[hierarchy_b] = cached
+    return cached[1]
+
+
+def self_intersect(curve, tolerance=1e-6):
+    '''
+    Points where a curve crosses itself, as (u, v, point) with u < v. The curve is cut
+    into monotone pieces (which can't cross themselves) and pieces are tested pairwise,
+    ignoring the joint that neighbouring pieces share.
+    '''
+    if len(curve.points) < 3:
+        return []
+    curve_hierarchy = hierarchy(curve)
+    cached = curve_hierarchy.crossings.get(curve_hierarchy)
+    if cached is not None and cached[0] == tolerance:
+        return cached[1]
+
+    pieces = curve_hierarchy.monotone_pieces()
+    # pieces that never became monotone sit on a cusp, where the curve only touches itself
+    cusps = [piece.control[0, :2] / piece.control[0, 2] for piece in pieces if not piece.is_monotone()]
+    hits = []
+    for i, piece_a in enumerate(pieces):
+        joint = piece_a.control[-1, :2] / piece_a.control[-1, 2]
+        for j, piece_b in enumerate(pieces[i + 1:], i + 1):
+            for u, v, point in node_pair_intersections([(piece_a, piece_b)], tolerance):
+                # neighbours always meet at their shared end point
+                if j == i + 1 and np.hypot(*(point - joint)) < FLATNESS:
+                    continue
+                if any(np.hypot(*(point - cusp)) < FLATNESS for cusp in cusps):
+                    continue
+                hits.append((u, v, point))
+    hits = unique_hits(hits, tolerance)
+    curve_hierarchy.crossings[curve_hierarchy] = (tolerance, hits)
+    return hits
+
+
+def scene_intersections(curves, tolerance=1e-6, self_intersections=True):
+    '''
+    Every crossing in a scene, as (i, j, u, v, point) with i <= j indices into curves.
+    Curves are swept by the left edge of their bounding box so only pairs whose boxes
+    overlap in x are compared.
+    '''
+    hierarchies = [(index, hierarchy(curve)) for index, curve in enumerate(curves) if len(curve.points) >= 2]
+    hierarchies.sort(key=lambda item: item[1].low[0])
+
+    results = []
+    active = []
+    for index, current in hierarchies:
+        active = [(other_index, other) for other_index, other in active if other.high[0] >= current.low[0] - tolerance]
+        for other_index, other in active:
+            if np.all(other.low <= current.high + tolerance) and np.all(current.low <= other.high + tolerance):
+                i, j = sorted((index, other_index))
+                results.extend((i, j, u, v, point) for u, v, point in intersect(curves[i], curves[j], tolerance))
+        active.append((index, current))
+
+    if self_intersections:
+        for index, curve in enumerate(curves):
+            results.extend((index, index, u, v, point) for u, v, point in self_intersect(curve, tolerance))
+    return sorted(results, key=lambda hit: (hit[0], hit[1], hit[2]))
@@ -0,0 +1,83 @@
+import numpy as np
+
+from .curve import K, Nurb
+
+
+def direction(degree, n):
+    # a Nurb of n zero points standing in for one parametric direction, for its knots and cached basis
+    curve = Nurb(degree)
+    curve.points = np.zeros((n, 4))
+    return curve
+
+
+class NurbSurface():
+    '''
+    Tensor product NURBS surface (Piegl & Tiller, 1997, 4.4), control grid P_ij with
+    weights w_ij and one clamped knot vector per direction:
+    S(u, v) = (sum i sum j N_i,p(u) N_j,q(v) w_ij P_ij) / (sum i sum j N_i,p(u) N_j,q(v) w_ij)
+    '''
+
+    def __init__(self, points=None, degree_u=K-1, degree_v=K-1):
+        # (n_u, n_v, 4) grid of (x, y, z, w)
+        self.points = np.empty((0, 0, 4)) if points is None else np.asarray(points, dtype=float)
+        self.degree_u = degree_u
+        self.degree_v = degree_v
+
+    def directions(self):
+        return direction(self.degree_u, self.points.shape[0]), direction(self.degree_v, self.points.shape[1])
+
+    def homogeneous(self):
+        # (x, y, z, w) -> (w*x, w*y, w*z, w)
+        weights = self.points[..., -1:]
+        return np.concatenate((self.points[..., :-1] * weights, weights), axis=-1)
+
+    def create_surface(self, num_u, num_v, out=None):
+        '''
+        num_u x num_v samples at uniform (u, v), into out (num_u, num_v, 3) when given.
+        The double sum is separable, so with the cached basis matrices B_u (num_u, n_u) and
+        B_v (num_v, n_v) the homogeneous grid H = B_u P^w B_v^T is two matrix products
+        '''
+        if out is None:
+            out = np.empty((num_u, num_v, 3))
+        if self.points.size == 0:
+            return out[:0, :0]
+        along_u, along_v = self.directions()
+        h = np.tensordot(along_u.basis_matrix(num_u), self.homogeneous(), axes=1)
+        h = np.matmul(along_v.basis_matrix(num_v), h)
+        np.divide(h[..., :3], h[..., 3:], out=out)
+        return out
+
+    def reference_surface(self, num_u, num_v):
+        # point by point through the recursive deboor of each direction, to check create_surface against
+        along_u, along_v = self.directions()
+        knots_u = along_u.normalized_knot(along_u.knot_vector())
+        knots_v = along_v.normalized_knot(along_v.knot_vector())
+        n_u, n_v = self.points.shape[:2]
+        out = np.empty((num_u, num_v, 3))
+        for a, u in enumerate(np.linspace(0, 1, num_u)):
+            basis_u = [along_u.deboor(u, i, along_u.order() - 1, knots_u) for i in range(n_u)]
+            for b, v in enumerate(np.linspace(0, 1, num_v)):
+                basis_v = [along_v.deboor(v, j, along_v.order() - 1, knots_v) for j in range(n_v)]
+                first = np.zeros(3)
+                second = 0
+                for i in range(n_u):
+                    for j in range(n_v):
+                        weight = self.points[i, j, -1] * basis_u[i] * basis_v[j]
+                        first = first + weight * self.points[i, j, :-1]
+                        second = second + weight
+                out[a, b] = first / second
+        return out
+
+    def mesh(self, num_u, num_v):
+        '''
+        Triangle mesh of the sample grid: vertices (num_u * num_v, 3) and two triangles per
+        grid cell, faces ((num_u - 1) * (num_v - 1) * 2, 3) of vertex indices. Both are empty
+        for a surface without control points
+        '''
+        if self.points.size == 0:
+            return np.empty((0, 3)), np.empty((0, 3), dtype=int)
+        vertices = self.create_surface(num_u, num_v).reshape(-1, 3)
+        grid = np.arange(num_u * num_v).reshape(num_u, num_v)
+        corners = grid[:-1, :-1].ravel(), grid[1:, :-1].ravel(), grid[1:, 1:].ravel(), grid[:-1, 1:].ravel()
+        faces = np.concatenate((np.column_stack(corners[:3]), np.column_stack((corners[0], corners[2], corners[3]))))
+        return vertices, faces